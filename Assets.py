@@ -0,0 +1,122 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from SpatialGrid import *
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Scaled images are kept here as raw pixels, named after a hash of the source
+# file and the size they were scaled to, so a changed image or a different
+# window size never picks up a stale entry
+ASSET_CACHE_DIR = os.path.join(ROOT, ".cache", "assets")
+ASSET_THREADS = 2
+
+# Side of the square pieces the static layer is cut into, and how many
+# chunk widths outside the view a chunk may be before it is dropped
+CHUNK_SIZE = 512
+CHUNK_MARGIN = 1
+
+def decode_image(path, size=None, alpha=False, cache_dir=ASSET_CACHE_DIR):
+    # Decode and scale without touching the display, so this is safe to run on
+    # a worker thread. The surface still has to be converted before blitting
+    with open(path, "rb") as f:
+        data = f.read()
+    if size is None:
+        return pygame.image.load(path)
+    mode = "RGBA" if alpha else "RGB"
+    width, height = size
+    cached = os.path.join(cache_dir, f"{hashlib.sha1(data).hexdigest()}-{width}x{height}-{mode.lower()}.raw")
+    try:
+        with open(cached, "rb") as f:
+            return pygame.image.fromstring(f.read(), size, mode)
+    except (OSError, ValueError):
+        pass
+    image = pygame.transform.scale(pygame.image.load(path), size)
+    try:
+        # Written under a temporary name first, so a half-written entry is never read
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cached + ".tmp", "wb") as f:
+            f.write(pygame.image.tostring(image, mode))
+        os.replace(cached + ".tmp", cached)
+    except OSError:
+        pass
+    return image
+
+class AssetLoader:
+    # Decodes images on worker threads while the main thread keeps a window
+    # responsive. load() returns a future of the unconverted surface
+    def __init__(self, threads=ASSET_THREADS):
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix="assets")
+        self.futures = []
+
+    def load(self, path, size=None, alpha=False):
+        future = self.pool.submit(decode_image, path, size, alpha)
+        self.futures.append(future)
+        return future
+
+    def progress(self):
+        # Fraction of the queued assets that are ready
+        if not self.futures:
+            return 1.0
+        return sum(future.done() for future in self.futures) / len(self.futures)
+
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+class StaticLayer:
+    # The background, tiled across the world, with every static obstacle
+    # composited into it. It is cut into CHUNK_SIZE squares that are built the
+    # first time they come into view and dropped once they are well outside
+    # it, so memory and build time follow the view rather than the map size.
+    # Chunks are kept until a different level layout is built
+    def __init__(self, background, chunk_size=CHUNK_SIZE):
+        self.background = background
+        self.chunk_size = chunk_size
+        self.level = None
+        self.obstacles = []
+        self.grid = None
+        self.chunks = {}
+
+    def build(self, obstacles):
+        level = tuple(tuple(obstacle.rect) for obstacle in obstacles)
+        if level != self.level:
+            self.obstacles = obstacles
+            self.grid = SpatialGrid(level)
+            self.chunks = {}
+            self.level = level
+
+    def chunk_rect(self, cx, cy):
+        size = self.chunk_size
+        return pygame.Rect(cx * size, cy * size, size, size)
+
+    def chunk(self, cx, cy):
+        surface = self.chunks.get((cx, cy))
+        if surface is None:
+            area = self.chunk_rect(cx, cy)
+            surface = pygame.Surface(area.size, 0, self.background)
+            tile_width, tile_height = self.background.get_size()
+            for x in range(area.left // tile_width * tile_width, area.right, tile_width):
+                for y in range(area.top // tile_height * tile_height, area.bottom, tile_height):
+                    surface.blit(self.background, (x - area.x, y - area.y))
+            for i in self.grid.query(area):
+                self.obstacles[i].draw(surface, area.topleft)
+            self.chunks[(cx, cy)] = surface
+        return surface
+
+    def blit(self, win, area, offset):
+        # Copies the world rect `area` into a window that shows the world from offset
+        size = self.chunk_size
+        for cx in range(area.left // size, (area.right - 1) // size + 1):
+            for cy in range(area.top // size, (area.bottom - 1) // size + 1):
+                chunk = self.chunk_rect(cx, cy)
+                part = area.clip(chunk)
+                win.blit(self.chunk(cx, cy), (part.x - offset[0], part.y - offset[1]), part.move(-chunk.x, -chunk.y))
+
+    def evict(self, view):
+        margin = CHUNK_MARGIN * self.chunk_size
+        keep = view.inflate(margin * 2, margin * 2)
+        for key in [key for key in self.chunks if not keep.colliderect(self.chunk_rect(*key))]:
+            del self.chunks[key]
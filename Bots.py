@@ -0,0 +1,133 @@
+from Player import *
+from Navigation import *
+
+# Scripted players, called once per tick as bot(world, index) for that
+# player's INPUT_* bits. Used by benchmarks and to fill out big matches
+
+class RandomBot:
+    # Holds a random input for a random number of ticks, the way a person
+    # mashing keys would, rather than new noise every tick
+    def __init__(self, rng):
+        self.rng = rng
+        self.inputs = 0
+        self.hold = 0
+
+    def __call__(self, world, index):
+        if self.hold == 0:
+            self.inputs = self.rng.getrandbits(5)
+            self.hold = self.rng.randrange(1, 30)
+        self.hold -= 1
+        inputs = self.inputs
+        # Only the first tick of a hold fires, like a KEYDOWN
+        self.inputs &= ~INPUT_SHOOT
+        return inputs
+
+class ChaseBot:
+    # Walks towards the player it aims at, jumps when they are above or it is stuck,
+    # and fires at a fixed rate. When its shots stop landing, say behind a
+    # platform, it wanders off jumping for a while to find another angle
+    def __init__(self, rng, fire_interval=20, keep_distance=200, patience=180):
+        self.rng = rng
+        self.fire_interval = fire_interval
+        self.keep_distance = keep_distance
+        self.patience = patience
+        self.phase = rng.randrange(fire_interval)
+        self.last_x = None
+        self.last_hit = 0
+        self.their_health = None
+        self.wander = INPUT_LEFT
+
+    def __call__(self, world, index):
+        me = world.players[index].rect
+        opponent = world.players[world.targets[index]]
+        them = opponent.rect
+        if opponent.health != self.their_health or world.tick < self.last_hit:
+            self.their_health = opponent.health
+            self.last_hit = world.tick
+        inputs = 0
+        since_hit = world.tick - self.last_hit
+        if since_hit > self.patience:
+            if since_hit == self.patience + 1 or me.x == self.last_x:
+                self.wander = self.rng.choice((INPUT_LEFT, INPUT_RIGHT))
+            inputs |= self.wander | INPUT_UP
+            # After wandering as long again, go back to chasing
+            if since_hit > 2 * self.patience:
+                self.last_hit = world.tick
+        else:
+            gap = them.centerx - me.centerx
+            if abs(gap) > self.keep_distance:
+                inputs |= INPUT_RIGHT if gap > 0 else INPUT_LEFT
+            if them.bottom < me.top or (inputs and me.x == self.last_x):
+                inputs |= INPUT_UP
+        self.last_x = me.x
+        if (world.tick + self.phase) % self.fire_interval == 0:
+            inputs |= INPUT_SHOOT
+        return inputs
+
+class NavBot:
+    # Finds its way over the platforms to the player it aims at by the level's
+    # NavGraph, and fires on a fixed beat but only when the shot would get
+    # through. Routes and lines of sight are cached in the graph and shared by
+    # every NavBot on the level, so most ticks are a few dictionary lookups.
+    # If it stays on one surface too long without getting anywhere, it
+    # wanders off jumping for a while, like ChaseBot
+    def __init__(self, rng, fire_interval=20, keep_distance=200, patience=180):
+        self.rng = rng
+        self.fire_interval = fire_interval
+        self.keep_distance = keep_distance
+        self.patience = patience
+        self.phase = rng.randrange(fire_interval)
+        self.node = None
+        # Ticks spent on the current surface
+        self.since = 0
+        # The edge being taken, from its takeoff until landing
+        self.edge = None
+        self.wander = INPUT_LEFT
+
+    def __call__(self, world, index):
+        player = world.players[index]
+        if player.exploding:
+            return 0
+        nav = nav_graph(world)
+        me = player.rect
+        target = world.players[world.targets[index]]
+        them = target.rect
+        if player.on_ground:
+            inputs = self.walk(nav, me, target)
+        elif self.edge is not None:
+            inputs = nav.steer(me, self.edge)
+        else:
+            inputs = toward(me.x, them.x, nav.speed)
+        if (world.tick + self.phase) % self.fire_interval == 0 and nav.clear_shot(*me.center, *them.center):
+            inputs |= INPUT_SHOOT
+        return inputs
+
+    def walk(self, nav, me, target):
+        self.edge = None
+        node = nav.node_at(me)
+        if node != self.node:
+            self.node = node
+            self.since = 0
+        self.since += 1
+        if self.since > self.patience:
+            if self.since == self.patience + 1:
+                self.wander = self.rng.choice((INPUT_LEFT, INPUT_RIGHT))
+            # After wandering as long again, go back to chasing
+            if self.since > 2 * self.patience:
+                self.since = 0
+            return self.wander | INPUT_UP
+        goal = nav.node_at(target.rect) if target.on_ground else nav.node_below(target.rect)
+        edge = None if node is None or node == goal else nav.route(node, goal)
+        if edge is None:
+            # On the same surface, or no way there: close in to shooting distance
+            self.since = 0
+            gap = target.rect.centerx - me.centerx
+            if abs(gap) > self.keep_distance:
+                return INPUT_RIGHT if gap > 0 else INPUT_LEFT
+            return 0
+        if abs(me.x - edge[2]) >= nav.speed:
+            return toward(me.x, edge[2], nav.speed)
+        self.edge = edge
+        return nav.launch(node, edge)
+
+BOTS = {"random": RandomBot, "chase": ChaseBot, "nav": NavBot}
@@ -0,0 +1,96 @@
+import numpy as np
+import pygame
+from Player import *
+from SpatialGrid import *
+
+# Starting capacity; the arrays double whenever a burst outgrows them
+BULLET_CAPACITY = 1024
+
+class BulletPool:
+    # Every live bullet in the match, one preallocated array per field.
+    # Live bullets are always packed into the first `count` slots.
+    fields = ("x", "y", "dx", "dy", "owner")
+
+    def __init__(self, capacity=BULLET_CAPACITY):
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        # Movement per tick, i.e. the aim direction already scaled by bullet_speed
+        self.dx = np.zeros(capacity)
+        self.dy = np.zeros(capacity)
+        self.owner = np.zeros(capacity, dtype=np.intp)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.sprites = {}
+        # (x, y, dx, dy) arrays of the bullets that hit a platform during the
+        # last Combat.update, with x and y their centers at impact, or None if none did
+        self.impacts = None
+
+    def __len__(self):
+        return self.count
+
+    def grow(self):
+        capacity = len(self.x) * 2
+        for name in self.fields + ("alive",):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def spawn(self, x, y, dx, dy, owner):
+        if self.count == len(self.x):
+            self.grow()
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.dx[i] = dx
+        self.dy[i] = dy
+        self.owner[i] = owner
+        self.alive[i] = True
+        self.count += 1
+
+    def clear(self):
+        self.count = 0
+
+    def compact(self):
+        # Swap-remove: dead slots inside the surviving prefix are refilled from
+        # the live bullets past it, so only the removed bullets' worth of data moves
+        n = self.count
+        alive = self.alive[:n]
+        live = int(np.count_nonzero(alive))
+        if live == n:
+            return
+        holes = np.flatnonzero(~alive[:live])
+        movers = np.flatnonzero(alive[live:]) + live
+        for name in self.fields:
+            array = getattr(self, name)
+            array[holes] = array[movers]
+        self.alive[holes] = True
+        self.count = live
+
+    def sprite(self, color):
+        if color not in self.sprites:
+            surface = pygame.Surface((bullet_width, bullet_height))
+            surface.fill(color)
+            self.sprites[color] = surface
+        return self.sprites[color]
+
+    def draw(self, win, players, view=None):
+        # Returns the rects drawn over, for dirty-rect updates. With a view
+        # (a world rect shown at the window's top left), bullets outside it
+        # are culled first
+        n = self.count
+        owner = self.owner[:n]
+        xs, ys = self.x[:n].astype(int), self.y[:n].astype(int)
+        if view is not None:
+            visible = ((xs + bullet_width > view.left) & (xs < view.right)
+                       & (ys + bullet_height > view.top) & (ys < view.bottom))
+            owner, xs, ys = owner[visible], xs[visible] - view.x, ys[visible] - view.y
+        drawn = []
+        for i, player in enumerate(players):
+            # Bullets disappear with their owner while it explodes, as before
+            if player.exploding:
+                continue
+            mine = owner == i
+            sprite = self.sprite(player.color)
+            drawn.extend(win.blits([(sprite, pos) for pos in zip(xs[mine].tolist(), ys[mine].tolist())]))
+        return drawn
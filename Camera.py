@@ -0,0 +1,30 @@
+import pygame
+
+class Camera:
+    # The window's view into a world that may be bigger than it. It keeps the
+    # players it follows centered, stopping at the edges of the world, and
+    # stays put on worlds that fit in the window
+    def __init__(self, width, height, world_width, world_height):
+        self.world = pygame.Rect(0, 0, world_width, world_height)
+        # In world coordinates, always a whole number of pixels
+        self.rect = pygame.Rect(0, 0, min(width, world_width), min(height, world_height))
+        # Indices of the followed players; all of them when None
+        self.focus = None
+
+    @property
+    def size(self):
+        return self.rect.size
+
+    @property
+    def offset(self):
+        return self.rect.topleft
+
+    def follow(self, players):
+        # Returns True if the view moved
+        followed = players if self.focus is None else [players[i] for i in self.focus]
+        x = sum(player.rect.centerx for player in followed) // len(followed)
+        y = sum(player.rect.centery for player in followed) // len(followed)
+        previous = self.rect.topleft
+        self.rect.center = (x, y)
+        self.rect.clamp_ip(self.world)
+        return self.rect.topleft != previous
@@ -0,0 +1,151 @@
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+import pygame
+from Renderer import *
+
+CAPTURE_FORMATS = ("png", "raw")
+# What happens to a frame when every buffer is still waiting on the writers:
+# drop skips it so the game never waits, block waits so no frame is lost
+CAPTURE_POLICIES = ("drop", "block")
+# Frames that may be queued for the writers at once
+CAPTURE_QUEUE = 8
+# Writer threads for PNG, one per spare core up to four; zlib lets go of the
+# GIL, so they encode side by side. A raw stream has to stay in order, so it
+# always gets one
+CAPTURE_THREADS = max(1, min(4, (os.cpu_count() or 1) - 1))
+# zlib level for PNG: the fastest, since these are for review, not archiving
+PNG_LEVEL = 1
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def encode_png(rows, width, height):
+    # rows is height rows of a 0 filter byte then width RGB pixels, which is
+    # all an unfiltered 8-bit truecolor PNG needs before zlib
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (PNG_SIGNATURE + png_chunk(b"IHDR", header)
+            + png_chunk(b"IDAT", zlib.compress(rows, PNG_LEVEL)) + png_chunk(b"IEND", b""))
+
+class FrameWriter:
+    # Writes captured frames on background threads. Frames live in a fixed
+    # pool of RGB buffers, each with a Surface drawn straight into it: the
+    # game takes one with acquire(), fills it and passes it to submit(), and
+    # a writer gives it back once it is on disk. PNG frames are numbered
+    # files in a directory, so dropped frames show up as gaps; raw is one
+    # file of bare rgb24 frames, which ffmpeg reads with
+    # -f rawvideo -pix_fmt rgb24 -s WxH -r 60
+    def __init__(self, path, size, format="png", policy="block", depth=CAPTURE_QUEUE, threads=CAPTURE_THREADS):
+        if format not in CAPTURE_FORMATS:
+            raise ValueError(f"unknown capture format {format!r}")
+        if policy not in CAPTURE_POLICIES:
+            raise ValueError(f"unknown capture policy {policy!r}")
+        self.path = path
+        self.size = size
+        self.format = format
+        self.policy = policy
+        width, height = size
+        self.free = queue.Queue()
+        for _ in range(depth):
+            buffer = bytearray(width * height * 3)
+            self.free.put((buffer, pygame.image.frombuffer(buffer, size, "RGB")))
+        # Never blocks: there are only as many frames as fit in it
+        self.frames = queue.Queue(depth)
+        if format == "raw":
+            self.stream = open(path, "wb")
+            threads = 1
+        else:
+            self.stream = None
+            os.makedirs(path, exist_ok=True)
+        self.written = 0
+        self.dropped = 0
+        # Seconds the game spent waiting on a free buffer under the block policy
+        self.waited = 0.0
+        self.error = None
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self.run, name=f"capture-{i}", daemon=True)
+                        for i in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def acquire(self):
+        # A free (buffer, surface) frame, or None if the drop policy drops this one
+        if self.policy == "block":
+            start = time.perf_counter()
+            frame = self.free.get()
+            self.waited += time.perf_counter() - start
+            return frame
+        try:
+            return self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return None
+
+    def submit(self, frame, number):
+        # Raises the first write error rather than carry on capturing into nothing
+        if self.error is not None:
+            self.free.put(frame)
+            raise self.error
+        self.frames.put((number, frame))
+
+    def run(self):
+        width, height = self.size
+        # Each writer's rows with their filter bytes, reused for every frame
+        rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+        while True:
+            item = self.frames.get()
+            if item is None:
+                return
+            number, frame = item
+            buffer = frame[0]
+            try:
+                if self.stream is not None:
+                    self.stream.write(buffer)
+                else:
+                    rows[:, 1:] = np.frombuffer(buffer, np.uint8).reshape(height, width * 3)
+                    with open(os.path.join(self.path, f"frame{number:06d}.png"), "wb") as f:
+                        f.write(encode_png(rows, width, height))
+                with self.lock:
+                    self.written += 1
+            except Exception as error:
+                # Raised on the game's thread by the next submit() or close()
+                with self.lock:
+                    if self.error is None:
+                        self.error = error
+            finally:
+                # Always handed back, so a failed write can't starve acquire()
+                self.free.put(frame)
+
+    def close(self):
+        # Waits for every queued frame to be written. Raises the first write error
+        for _ in self.threads:
+            self.frames.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.stream is not None:
+            self.stream.close()
+        if self.error is not None:
+            raise self.error
+
+class CaptureRenderer(DirtyRenderer):
+    # The software renderer drawing into an offscreen surface instead of a
+    # window, so it runs with no display, and presenting a frame means
+    # copying it into one of the writer's buffers. Each draw() is one frame
+    def __init__(self, writer, background, obstacles, camera):
+        win = pygame.Surface(camera.size)
+        super().__init__(win, StaticLayer(background.convert(win)), obstacles, camera)
+        self.writer = writer
+        self.frame = 0
+
+    def present(self, full, rects):
+        with self.profiler.scope("present"):
+            frame = self.writer.acquire()
+            if frame is not None:
+                frame[1].blit(self.win, (0, 0))
+                self.writer.submit(frame, self.frame)
+        self.frame += 1
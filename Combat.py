@@ -0,0 +1,142 @@
+import numpy as np
+from Player import *
+from SpatialGrid import *
+
+# Up to this many bullet-player pairs every bullet is box-tested against every
+# player in one array operation; past it bullets and players only meet through
+# a grid rebuilt every tick, which costs more up front but grows with the pairs
+# that are actually close. Around 600 bullets among 64 players they break even
+COMBAT_DENSE_LIMIT = 32768
+# Cell keys pack the column above the row, which is offset so it stays positive
+KEY_ROW_OFFSET = 1 << 31
+
+def cell_pairs(cell_size, left, top, right, bottom):
+    # (cell key, box index) for every grid cell each box touches
+    cx0, cx1 = (left // cell_size).astype(np.int64), (right // cell_size).astype(np.int64)
+    cy0, cy1 = (top // cell_size).astype(np.int64), (bottom // cell_size).astype(np.int64)
+    keys, boxes = [], []
+    for ox in range(int((cx1 - cx0).max()) + 1):
+        for oy in range(int((cy1 - cy0).max()) + 1):
+            index = np.flatnonzero((cx0 + ox <= cx1) & (cy0 + oy <= cy1))
+            keys.append((cx0[index] + ox) * (KEY_ROW_OFFSET * 2) + cy0[index] + oy + KEY_ROW_OFFSET)
+            boxes.append(index)
+    return np.concatenate(keys), np.concatenate(boxes)
+
+class Combat:
+    # Who fights whom: the team of each player, who each player aims at, and
+    # every bullet resolved against every enemy player in one vectorized pass,
+    # with no per-pair Python loop however many players there are
+    def __init__(self, teams, cell_size=CELL_SIZE, dense_limit=COMBAT_DENSE_LIMIT):
+        self.teams = np.array(teams, dtype=np.intp)
+        # enemies[i, j]: player i's bullets can hit player j
+        self.enemies = self.teams[:, None] != self.teams
+        self.cell_size = cell_size
+        self.dense_limit = dense_limit
+        # Running count of bullet-vs-player box tests, read by the profiler
+        self.tests = 0
+
+    def out(self, players):
+        # A player whose explosion has run its course is out of the match
+        return np.array([player.health <= 0 and player.explosion_frame >= explosion_duration for player in players])
+
+    def standing(self, players):
+        # Team ids that still have a player in the match, in order
+        out = self.out(players)
+        return sorted(set(self.teams[~out].tolist()))
+
+    def targets(self, players):
+        # Each player aims at the nearest enemy still standing, failing that
+        # the nearest enemy at all, and with no enemies at itself
+        n = len(players)
+        if n == 2:
+            # The classic match: the other player, unless they are teammates
+            return [1, 0] if self.enemies[0, 1] else [0, 1]
+        x = np.array([player.rect.centerx for player in players], dtype=np.int64)
+        y = np.array([player.rect.centery for player in players], dtype=np.int64)
+        distance = (x[:, None] - x) ** 2 + (y[:, None] - y) ** 2
+        alive = np.array([player.health > 0 for player in players])
+        never = np.iinfo(np.int64).max
+        anyone = np.where(self.enemies, distance, never)
+        living = np.where(self.enemies & alive, distance, never)
+        target = np.where((living < never).any(axis=1), living.argmin(axis=1), anyone.argmin(axis=1))
+        return np.where(self.enemies.any(axis=1), target, np.arange(n)).tolist()
+
+    def pairs(self, left, top, right, bottom, owner, px, py, live):
+        # Candidate (bullet, player) pairs: the bullet's swept box overlaps the
+        # player's box, and the player is an enemy of its owner still in the match
+        w = h = player_size
+        if len(left) * len(px) <= self.dense_limit:
+            self.tests += len(left) * len(px)
+            near = ((left[:, None] < px + w) & (right[:, None] > px) &
+                    (top[:, None] < py + h) & (bottom[:, None] > py) & self.enemies[owner] & live)
+            return np.nonzero(near)
+        # Bullets and players meet in the cells they share: player cells are
+        # sorted by key, and each bullet cell looks its key up in them
+        players = np.flatnonzero(live)
+        player_keys, player_index = cell_pairs(self.cell_size, px[players], py[players],
+                                               px[players] + w, py[players] + h)
+        order = np.argsort(player_keys, kind="stable")
+        player_keys, player_index = player_keys[order], players[player_index[order]]
+        bullet_keys, bullet_index = cell_pairs(self.cell_size, left, top, right, bottom)
+        first = np.searchsorted(player_keys, bullet_keys, "left")
+        counts = np.searchsorted(player_keys, bullet_keys, "right") - first
+        total = int(counts.sum())
+        rows = np.repeat(bullet_index, counts)
+        # Position of each pair inside its bullet cell's run of players
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        cols = player_index[np.repeat(first, counts) + within]
+        self.tests += total
+        near = ((left[rows] < px[cols] + w) & (right[rows] > px[cols]) &
+                (top[rows] < py[cols] + h) & (bottom[rows] > py[cols]) & self.enemies[owner[rows], cols])
+        return rows[near], cols[near]
+
+    def update(self, bullets, players, obstacles, width, height):
+        # One tick of every bullet: it hits whatever comes first along its
+        # path, an enemy player or a platform, or else flies on
+        bullets.impacts = None
+        n = bullets.count
+        if n == 0:
+            return
+        x, y = bullets.x[:n], bullets.y[:n]
+        dx, dy = bullets.dx[:n], bullets.dy[:n]
+        owner = bullets.owner[:n]
+        px = np.array([player.rect.x for player in players])
+        py = np.array([player.rect.y for player in players])
+
+        # Positions stay fractional, and hits are swept along this tick's whole
+        # path, so fast bullets can't skip over a player or a 10px platform
+        left, top = np.minimum(x, x + dx), np.minimum(y, y + dy)
+        right, bottom = np.maximum(x, x + dx) + bullet_width, np.maximum(y, y + dy) + bullet_height
+        rows, cols = self.pairs(left, top, right, bottom, owner, px, py, ~self.out(players))
+        t_player = np.full(n, np.inf)
+        victim = np.full(n, -1, dtype=np.intp)
+        if len(rows):
+            times = sweep_times(x[rows], y[rows], dx[rows], dy[rows], bullet_width, bullet_height,
+                                px[cols], py[cols], px[cols] + player_size, py[cols] + player_size)
+            # Per bullet, the earliest hit, and on a tie the lowest player index
+            order = np.lexsort((cols, times, rows))
+            rows, cols, times = rows[order], cols[order], times[order]
+            first = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            t_player[rows[first]] = times[first]
+            victim[rows[first]] = cols[first]
+        t_obstacle = obstacles.sweep(x, y, dx, dy, bullet_width, bullet_height)
+        # A player standing right on a platform still takes the hit, as before
+        hit_player = np.isfinite(t_player) & (t_player <= t_obstacle)
+        hit_obstacle = np.isfinite(t_obstacle) & ~hit_player
+        if hit_obstacle.any():
+            t = t_obstacle[hit_obstacle]
+            hit_dx, hit_dy = dx[hit_obstacle], dy[hit_obstacle]
+            bullets.impacts = (x[hit_obstacle] + hit_dx * t + bullet_width / 2,
+                               y[hit_obstacle] + hit_dy * t + bullet_height / 2, hit_dx, hit_dy)
+
+        x += dx
+        y += dy
+        out_of_bounds = (x > width) | (x < 0) | (y > height) | (y < 0)
+
+        if hit_player.any():
+            hits = np.bincount(victim[hit_player], minlength=len(players))
+            for player, count in zip(players, hits.tolist()):
+                player.health -= count
+
+        bullets.alive[:n] = ~(hit_player | hit_obstacle | out_of_bounds)
+        bullets.compact()
@@ -0,0 +1,275 @@
+import math
+import numpy as np
+import pygame
+from Player import *
+
+# Explosions allocated up front; the pool only grows if more are alive at once
+EXPLOSION_CAPACITY = 8
+# While an explosion runs it keeps puffing smoke every this many ticks
+EXPLOSION_SMOKE_INTERVAL = 4
+
+# Most particles alive at once. Emitting past it drops the new particles, so
+# a pile of effects costs at most this much per frame
+PARTICLE_BUDGET = 2000
+# Particles fade out in this many alpha steps, one pre-made sprite each
+FADE_LEVELS = 4
+
+SPARK, DEBRIS, SMOKE = 0, 1, 2
+# Per kind: color, size in px, lifetime in ticks (min, max), speed in px per
+# tick (min, max), gravity and the fraction of velocity kept each tick
+PARTICLE_KINDS = (
+    (EXPLOSION_COLOR, 3, (10, 25), (3.0, 8.0), 0.15, 0.92),
+    ((110, 70, 30), 4, (30, 50), (1.5, 5.0), 0.4, 0.98),
+    ((90, 90, 90), 8, (40, 70), (0.3, 1.2), -0.03, 0.95),
+)
+# Back to front
+DRAW_ORDER = (SMOKE, DEBRIS, SPARK)
+
+# (kind, count) emitted by one player explosion, one bullet hitting a
+# platform, and each smoke puff of a running explosion
+EXPLOSION_BURST = ((SPARK, 60), (DEBRIS, 25), (SMOKE, 20))
+IMPACT_BURST = ((SPARK, 6), (SMOKE, 1))
+SMOKE_PUFF = ((SMOKE, 3),)
+
+class Explosion:
+    __slots__ = ("x", "y", "frame")
+
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+        self.frame = 0
+
+    def radius(self):
+        return explosion_radius * (self.frame / explosion_duration)
+
+class ExplosionPool:
+    # Explosion effects are acquired from a free list and released back to it
+    # when they finish, so a match never allocates one while it is running.
+    # They are purely visual: the simulation only follows Player.exploding.
+    # The growing circles are only drawn with particles turned off, so a
+    # player going out still shows without them
+    def __init__(self, capacity=EXPLOSION_CAPACITY):
+        self.free = [Explosion() for _ in range(capacity)]
+        self.active = []
+
+    def __len__(self):
+        return len(self.active)
+
+    def __iter__(self):
+        return iter(self.active)
+
+    def acquire(self, x, y, frame=0):
+        explosion = self.free.pop() if self.free else Explosion()
+        explosion.x = x
+        explosion.y = y
+        explosion.frame = frame
+        self.active.append(explosion)
+        return explosion
+
+    def release(self, explosion):
+        self.active.remove(explosion)
+        self.free.append(explosion)
+
+    def clear(self):
+        self.free.extend(self.active)
+        self.active.clear()
+
+    def update(self, particles):
+        # Same timeline as Player.update_explosion: grow for explosion_duration
+        # ticks, then finish on the tick after
+        for explosion in list(self.active):
+            if explosion.frame < explosion_duration:
+                explosion.frame += 1
+                if explosion.frame % EXPLOSION_SMOKE_INTERVAL == 0:
+                    particles.burst(explosion.x, explosion.y, SMOKE_PUFF)
+            else:
+                self.release(explosion)
+
+    def visible(self, view):
+        # (explosion, radius) for each circle that reaches into view
+        for explosion in self.active:
+            radius = explosion.radius()
+            if (explosion.x + radius > view.left and explosion.x - radius < view.right
+                    and explosion.y + radius > view.top and explosion.y - radius < view.bottom):
+                yield explosion, radius
+
+    def draw(self, win, view):
+        # Returns the rects drawn over, for dirty-rect updates
+        return [pygame.draw.circle(win, EXPLOSION_COLOR, (explosion.x - view.x, explosion.y - view.y), int(radius))
+                for explosion, radius in self.visible(view)]
+
+class NullParticles:
+    # Emits nothing, for worlds nobody looks at: headless runs, servers and benchmarks
+    count = 0
+    dropped = 0
+
+    def __len__(self):
+        return 0
+
+    def burst(self, x, y, recipe):
+        pass
+
+    def impacts(self, x, y, dx, dy):
+        pass
+
+    def update(self, width, height):
+        pass
+
+    def add_to_batch(self, batch, view=None):
+        pass
+
+    def draw(self, win, view=None):
+        return []
+
+NULL_PARTICLES = NullParticles()
+
+class ParticleSystem:
+    # Sparks, debris and smoke, one fixed-size array per field with the live
+    # particles packed into the first `count` slots. Emitting, moving and
+    # culling all work on whole arrays; drawing is one blits() call.
+    # Particles are visual only and draw from their own random generator,
+    # so they never affect the simulation
+    fields = ("x", "y", "vx", "vy", "age", "lifetime", "kind")
+
+    def __init__(self, budget=PARTICLE_BUDGET, seed=None):
+        self.count = 0
+        # Particles not emitted because the budget was full
+        self.dropped = 0
+        self.x = np.zeros(budget)
+        self.y = np.zeros(budget)
+        self.vx = np.zeros(budget)
+        self.vy = np.zeros(budget)
+        self.age = np.zeros(budget, dtype=np.int32)
+        self.lifetime = np.ones(budget, dtype=np.int32)
+        self.kind = np.zeros(budget, dtype=np.intp)
+        self.rng = np.random.default_rng(seed)
+        self.sizes = np.array([kind[1] for kind in PARTICLE_KINDS])
+        self.gravity = np.array([kind[4] for kind in PARTICLE_KINDS])
+        self.drag = np.array([kind[5] for kind in PARTICLE_KINDS])
+        self.sprites = None
+
+    def __len__(self):
+        return self.count
+
+    def emit(self, kind, x, y, direction=0.0, spread=2 * math.pi):
+        # One particle of `kind` per entry of the x and y arrays, flying off
+        # within spread / 2 of direction (radians, scalar or per particle)
+        n = min(len(x), len(self.x) - self.count)
+        self.dropped += len(x) - n
+        if n <= 0:
+            return
+        _, _, lifetime, speed, _, _ = PARTICLE_KINDS[kind]
+        rng = self.rng
+        angle = np.broadcast_to(direction, len(x))[:n] + rng.uniform(-spread / 2, spread / 2, n)
+        speed = rng.uniform(speed[0], speed[1], n)
+        span = slice(self.count, self.count + n)
+        self.x[span] = x[:n]
+        self.y[span] = y[:n]
+        self.vx[span] = np.cos(angle) * speed
+        self.vy[span] = np.sin(angle) * speed
+        self.age[span] = 0
+        self.lifetime[span] = rng.integers(lifetime[0], lifetime[1], n, endpoint=True)
+        self.kind[span] = kind
+        self.count += n
+
+    def burst(self, x, y, recipe):
+        # recipe is a sequence of (kind, count), all from one point in every direction
+        for kind, count in recipe:
+            self.emit(kind, np.full(count, float(x)), np.full(count, float(y)))
+
+    def impacts(self, x, y, dx, dy):
+        # Bullets that hit a platform at (x, y) while moving (dx, dy): sparks
+        # and smoke bounce back the way each bullet came
+        back = np.arctan2(-dy, -dx)
+        for kind, count in IMPACT_BURST:
+            self.emit(kind, np.repeat(x, count), np.repeat(y, count), np.repeat(back, count), math.pi)
+
+    def update(self, width, height):
+        # One tick for every particle; expired ones and any that left the
+        # world are dropped, keeping the rest in order
+        n = self.count
+        if n == 0:
+            return
+        kind = self.kind[:n]
+        drag = self.drag[kind]
+        vx, vy = self.vx[:n], self.vy[:n]
+        vx *= drag
+        vy *= drag
+        vy += self.gravity[kind]
+        x, y = self.x[:n], self.y[:n]
+        x += vx
+        y += vy
+        age = self.age[:n]
+        age += 1
+        alive = (age < self.lifetime[:n]) & (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        keep = np.flatnonzero(alive)
+        if len(keep) < n:
+            for name in self.fields:
+                array = getattr(self, name)
+                array[:len(keep)] = array[keep]
+            self.count = len(keep)
+
+    def fade(self):
+        # 0 for nearly expired up to FADE_LEVELS - 1 for fresh, per live particle
+        n = self.count
+        remaining = self.lifetime[:n] - self.age[:n]
+        return np.minimum(remaining * FADE_LEVELS // self.lifetime[:n], FADE_LEVELS - 1)
+
+    def build_sprites(self):
+        # One square per kind and fade level; needs the display for convert()
+        sprites = []
+        for color, size, *_ in PARTICLE_KINDS:
+            for level in range(FADE_LEVELS):
+                surface = pygame.Surface((size, size)).convert()
+                surface.fill(color)
+                surface.set_alpha(255 * (level + 1) // FADE_LEVELS)
+                sprites.append(surface)
+        return sprites
+
+    def visible(self, view):
+        # Indices of the live particles overlapping the world rect view (all
+        # of them without one), back to front
+        n = self.count
+        kind = self.kind[:n]
+        if view is None:
+            shown = np.arange(n)
+        else:
+            x, y, half = self.x[:n], self.y[:n], self.sizes[kind] / 2
+            shown = np.flatnonzero((x + half > view.left) & (x - half < view.right)
+                                   & (y + half > view.top) & (y - half < view.bottom))
+        rank = np.empty(len(PARTICLE_KINDS), dtype=np.intp)
+        rank[list(DRAW_ORDER)] = np.arange(len(DRAW_ORDER))
+        return shown[np.argsort(rank[kind[shown]], kind="stable")]
+
+    def add_to_batch(self, batch, view=None):
+        # The OpenGL path: every visible particle as a quad in a SpriteBatch,
+        # faded with the same alpha steps as the sprites
+        shown = self.visible(view)
+        kind = self.kind[shown]
+        alpha = (self.fade()[shown] + 1) / FADE_LEVELS
+        for k in DRAW_ORDER:
+            mine = kind == k
+            if not mine.any():
+                continue
+            color, size = PARTICLE_KINDS[k][:2]
+            colors = np.empty((int(np.count_nonzero(mine)), 4), dtype=np.float32)
+            colors[:, :3] = np.array(color) / 255
+            colors[:, 3] = alpha[mine]
+            batch.add_rects(self.x[shown][mine] - size // 2, self.y[shown][mine] - size // 2, size, size, colors)
+
+    def draw(self, win, view=None):
+        # Returns the rects drawn over, for dirty-rect updates. With a view (a
+        # world rect shown at the window's top left) only what is inside it is drawn
+        if self.count == 0:
+            return []
+        if self.sprites is None:
+            self.sprites = self.build_sprites()
+        shown = self.visible(view)
+        kind = self.kind[shown]
+        half = self.sizes[kind] // 2
+        left, top = (view.x, view.y) if view is not None else (0, 0)
+        xs = (self.x[shown] - half - left).astype(int).tolist()
+        ys = (self.y[shown] - half - top).astype(int).tolist()
+        sprites = self.sprites
+        index = (kind * FADE_LEVELS + self.fade()[shown]).tolist()
+        return win.blits([(sprites[i], pos) for i, pos in zip(index, zip(xs, ys))])
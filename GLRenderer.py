@@ -0,0 +1,136 @@
+import pygame
+from OpenGL.GL import *
+from OpenGL.GLU import *
+from Obstacle import *
+from Player import *
+from SpatialGrid import *
+from SpriteBatch import *
+from Effects import *
+from Profiler import *
+
+# Overlay textures kept alive; the HUD only ever shows a few different strings
+TEXTURE_CACHE_SIZE = 32
+
+def gl_color(color):
+    return tuple(channel / 255 for channel in color)
+
+class GLRenderer:
+    # OpenGL backend: textured background and overlays, everything else
+    # through one SpriteBatch so a frame costs a couple of draw calls
+    profiler = NULL_PROFILER
+
+    def __init__(self, camera, background, obstacles):
+        self.camera = camera
+        width, height = camera.size
+        self.width = width
+        self.height = height
+        pygame.display.set_mode((width, height), pygame.OPENGL | pygame.DOUBLEBUF)
+        glViewport(0, 0, width, height)
+        glMatrixMode(GL_PROJECTION)
+        glLoadIdentity()
+        gluOrtho2D(0, width, height, 0)
+        glMatrixMode(GL_MODELVIEW)
+        glLoadIdentity()
+        glEnable(GL_TEXTURE_2D)
+        # Overlay text is antialiased onto a transparent surface
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        # Rows of tightly packed RGB data are not 4-byte aligned
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+
+        self.background = self.upload(background)
+        self.textures = {}
+        self.batch = SpriteBatch()
+        self.set_level(obstacles)
+
+    def set_level(self, obstacles):
+        self.obstacles = obstacles
+        # Only the obstacles near the view are looked at each frame
+        self.grid = SpatialGrid([obstacle.rect for obstacle in obstacles])
+
+    def invalidate(self):
+        pass
+
+    def upload(self, surface):
+        texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        width, height = surface.get_size()
+        # Opaque surfaces may carry junk in their padding byte, so only real alpha is uploaded
+        if surface.get_flags() & pygame.SRCALPHA:
+            data = pygame.image.tostring(surface, "RGBA")
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, data)
+        else:
+            data = pygame.image.tostring(surface, "RGB")
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, width, height, 0, GL_RGB, GL_UNSIGNED_BYTE, data)
+        return texture
+
+    def overlay_texture(self, surface):
+        # Overlay surfaces come out of the TextCache, so the same object means the same pixels
+        texture = self.textures.get(surface)
+        if texture is None:
+            if len(self.textures) >= TEXTURE_CACHE_SIZE:
+                glDeleteTextures(list(self.textures.values()))
+                self.textures.clear()
+            texture = self.upload(surface)
+            self.textures[surface] = texture
+        return texture
+
+    def draw_texture(self, texture, x, y, width, height):
+        glBindTexture(GL_TEXTURE_2D, texture)
+        glBegin(GL_QUADS)
+        glTexCoord2f(0, 0)
+        glVertex2f(x, y)
+        glTexCoord2f(1, 0)
+        glVertex2f(x + width, y)
+        glTexCoord2f(1, 1)
+        glVertex2f(x + width, y + height)
+        glTexCoord2f(0, 1)
+        glVertex2f(x, y + height)
+        glEnd()
+
+    def draw(self, world, overlays):
+        glClear(GL_COLOR_BUFFER_BIT)
+        self.camera.follow(world.players)
+        view = self.camera.rect
+        # The background is one window-sized texture, tiled across the world
+        width, height = self.width, self.height
+        for x in range(view.left // width * width, view.right, width):
+            for y in range(view.top // height * height, view.bottom, height):
+                self.draw_texture(self.background, x - view.x, y - view.y, width, height)
+
+        # Everything else is in world coordinates, and culled to the view
+        # before it goes into the batch
+        glPushMatrix()
+        glTranslatef(-view.x, -view.y, 0)
+        batch = self.batch
+        bullets = world.bullets
+        n = bullets.count
+        owner = bullets.owner[:n]
+        xs, ys = bullets.x[:n], bullets.y[:n]
+        visible = (xs + bullet_width > view.left) & (xs < view.right) & (ys + bullet_height > view.top) & (ys < view.bottom)
+        world.particles.add_to_batch(batch, view)
+        if world.particles is NULL_PARTICLES:
+            for explosion, radius in world.explosions.visible(view):
+                batch.add_circle(explosion.x, explosion.y, radius, gl_color(EXPLOSION_COLOR))
+        for i, player in enumerate(world.players):
+            if player.exploding:
+                continue
+            color = gl_color(player.color)
+            if player.rect.colliderect(view):
+                batch.add_rect(player.rect.x, player.rect.y, player_size, player_size, color)
+            mine = visible & (owner == i)
+            batch.add_rects(xs[mine], ys[mine], bullet_width, bullet_height, color)
+        for rect in self.grid.nearby(view):
+            if rect.colliderect(view):
+                batch.add_rect(rect.x, rect.y, rect.width, rect.height, gl_color(BROWN))
+        batch.flush()
+        glPopMatrix()
+
+        for surface, position in overlays:
+            width, height = surface.get_size()
+            self.draw_texture(self.overlay_texture(surface), position[0], position[1], width, height)
+
+        with self.profiler.scope("present"):
+            pygame.display.flip()
@@ -0,0 +1,173 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import numpy as np
+from Player import *
+from Obstacle import *
+from SpatialGrid import *
+
+# Levels are authored as levels/<name>.json:
+#   {"size": [w, h], "background": "ground.jpg", "spawns": [[x, y], ...],
+#    "platforms": [[x, y, w, h], ...]}
+# and compiled to levels/<name>.lvl, which load_level() maps straight into
+# arrays. A .lvl is rebuilt whenever its .json is newer.
+#
+# Compiled layout, little endian: magic, version, cell size, width, height,
+# background name, spawns, then int32 arrays: platforms (n x 4), the grid's
+# occupied cells (k x 2), where each cell's entries start in the flat list
+# (k + 1), the flat list itself, and the grid's dense table (rows x cols x depth)
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LEVEL_DIR = os.path.join(ROOT, "levels")
+LEVEL_MAGIC = b"TPSL"
+LEVEL_VERSION = 1
+LEVEL_HEADER = struct.Struct("<4sHHII")
+GRID_HEADER = struct.Struct("<IiiIII")
+
+LEVELS = sorted(name[:-5] for name in os.listdir(LEVEL_DIR) if name.endswith(".json"))
+
+class Level:
+    # Everything a World and a renderer need to set up a map
+    def __init__(self, name, size, background, spawns, platforms, grid=None):
+        self.name = name
+        self.width, self.height = size
+        self.size = size
+        self.background = background
+        self.spawns = spawns
+        # (n, 4) int32 rects
+        self.platforms = platforms
+        self.obstacles = [Obstacle(*rect) for rect in platforms.tolist()]
+        if grid is None:
+            grid = SpatialGrid([obstacle.rect for obstacle in self.obstacles])
+        self.grid = grid
+
+    @property
+    def view(self):
+        # The window: the whole level, up to the default arena size, beyond
+        # which the camera scrolls
+        return min(self.width, WIDTH), min(self.height, HEIGHT)
+
+    @property
+    def background_path(self):
+        # Backgrounds are named relative to the game directory
+        return os.path.join(ROOT, self.background)
+
+def merge_platforms(rects):
+    # Platforms that touch or overlap along one row (same top and height) or one
+    # column (same left and width) become one rect. Their union is exactly that
+    # rect, so collisions don't change, but there are fewer rects to test.
+    # Merged platforms keep the place of their first member
+    def merge(rects, along):
+        # along is 0 to merge rows, 1 to merge columns
+        lane = 1 - along
+        order = sorted(range(len(rects)), key=lambda i: (rects[i][lane], rects[i][lane + 2], rects[i][along], i))
+        merged = []
+        for i in order:
+            rect = list(rects[i])
+            if merged:
+                first, last = merged[-1]
+                if (last[lane] == rect[lane] and last[lane + 2] == rect[lane + 2]
+                        and rect[along] <= last[along] + last[along + 2]):
+                    last[along + 2] = max(last[along] + last[along + 2], rect[along] + rect[along + 2]) - last[along]
+                    merged[-1] = (min(first, i), last)
+                    continue
+            merged.append((i, rect))
+        return [rect for _, rect in sorted(merged)]
+    return merge(merge([list(rect) for rect in rects], 0), 1)
+
+def parse_level(path):
+    with open(path) as f:
+        data = json.load(f)
+    width, height = data["size"]
+    # Without spawn points, players start where they always have
+    spawns = data.get("spawns", [[100, height // 2 - player_size // 2],
+                                 [width - 100 - player_size, height // 2 - player_size // 2]])
+    return (width, height), data.get("background", "ground.jpg"), [tuple(spawn) for spawn in spawns], data["platforms"]
+
+def compile_level(json_path, lvl_path):
+    (width, height), background, spawns, platforms = parse_level(json_path)
+    rects = np.array(merge_platforms(platforms), dtype=np.int32).reshape(-1, 4)
+    grid = SpatialGrid(rects.tolist())
+    grid.build_table()
+    keys = np.array(list(grid.cells), dtype=np.int32).reshape(-1, 2)
+    entries = [grid.cells[key] for key in grid.cells]
+    starts = np.cumsum([0] + [len(indices) for indices in entries], dtype=np.int32)
+    flat = np.array([i for indices in entries for i in indices], dtype=np.int32)
+    rows, cols, depth = grid.table.shape
+
+    name = background.encode()
+    parts = [LEVEL_HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, grid.cell_size, width, height),
+             struct.pack("<H", len(name)), name,
+             struct.pack("<H", len(spawns)), np.array(spawns, dtype=np.int32).tobytes(),
+             struct.pack("<I", len(rects)), rects.tobytes(),
+             GRID_HEADER.pack(len(keys), grid.table_x, grid.table_y, rows, cols, depth),
+             keys.tobytes(), starts.tobytes(), flat.tobytes(), grid.table.astype(np.int32).tobytes()]
+    with open(lvl_path, "wb") as f:
+        f.write(b"".join(parts))
+
+def read_level(name, lvl_path):
+    # The file is mapped rather than read; the arrays below are views into it
+    with open(lvl_path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, cell_size, width, height = LEVEL_HEADER.unpack_from(data)
+    if magic != LEVEL_MAGIC or version != LEVEL_VERSION:
+        raise ValueError(f"{lvl_path} is not a version {LEVEL_VERSION} level")
+    offset = LEVEL_HEADER.size
+
+    def array(count, shape=()):
+        nonlocal offset
+        values = np.frombuffer(data, np.int32, count * int(np.prod(shape, dtype=int)), offset)
+        offset += values.nbytes
+        return values.reshape((count,) + shape)
+
+    def uint(fmt):
+        nonlocal offset
+        value = struct.unpack_from(fmt, data, offset)[0]
+        offset += struct.calcsize(fmt)
+        return value
+
+    length = uint("<H")
+    background = bytes(data[offset:offset + length]).decode()
+    offset += length
+    spawns = [tuple(spawn) for spawn in array(uint("<H"), (2,)).tolist()]
+    platforms = array(uint("<I"), (4,))
+    cell_count, table_x, table_y, rows, cols, depth = GRID_HEADER.unpack_from(data, offset)
+    offset += GRID_HEADER.size
+    keys = array(cell_count, (2,)).tolist()
+    starts = array(cell_count + 1).tolist()
+    flat = array(starts[-1]).tolist()
+    cells = {tuple(key): flat[start:end] for key, start, end in zip(keys, starts, starts[1:])}
+    grid = SpatialGrid(platforms.tolist(), cell_size, cells)
+    grid.set_table(array(rows, (cols, depth)), table_x, table_y)
+    return Level(name, (width, height), background, spawns, platforms, grid)
+
+def rebuild_level(name, json_path, lvl_path):
+    try:
+        compile_level(json_path, lvl_path)
+    except OSError:
+        # A read-only install still runs, just from the JSON every time
+        size, background, spawns, platforms = parse_level(json_path)
+        return Level(name, size, background, spawns, np.array(merge_platforms(platforms), dtype=np.int32).reshape(-1, 4))
+    return read_level(name, lvl_path)
+
+def load_level(name):
+    json_path = os.path.join(LEVEL_DIR, f"{name}.json")
+    lvl_path = os.path.join(LEVEL_DIR, f"{name}.lvl")
+    if not os.path.exists(lvl_path) or (os.path.exists(json_path) and
+                                        os.path.getmtime(lvl_path) < os.path.getmtime(json_path)):
+        return rebuild_level(name, json_path, lvl_path)
+    try:
+        return read_level(name, lvl_path)
+    except (ValueError, struct.error):
+        # The .lvl is only a cache of the JSON: one from another format
+        # version, or cut short, is compiled again, the same as a stale one
+        if not os.path.exists(json_path):
+            raise
+        return rebuild_level(name, json_path, lvl_path)
+
+if __name__ == "__main__":
+    # python Levels.py [level.json ...] compiles the given levels, or all of them
+    for path in sys.argv[1:] or [os.path.join(LEVEL_DIR, f"{name}.json") for name in LEVELS]:
+        compile_level(path, path[:-5] + ".lvl")
+        print(f"compiled {path[:-5]}.lvl")
@@ -0,0 +1,353 @@
+import heapq
+import weakref
+from bisect import bisect_right
+import numpy as np
+import pygame
+from Player import *
+from SpatialGrid import *
+# The tunables as configure() last set them; the copies import * made are the defaults
+import Player as physics
+
+# Ways to get from one surface to another
+NAV_FALL = 0   # walk off an end and drop
+NAV_JUMP = 1   # jump from the takeoff point
+# Landing points are this far in from the end of a surface, where there is room
+NAV_LANDING_INSET = player_size // 2
+# Drops further than this only count towards the floor, which catches everything
+NAV_MAX_DROP = 600
+# Most surfaces A* expands per search, which bounds a bot's think time on any
+# map. A search that runs out heads for the closest surface it reached
+NAV_SEARCH_LIMIT = 256
+# Cached routes, surfaces below a point and lines of sight; each cache is
+# simply emptied when it fills up
+NAV_CACHE_SIZE = 1 << 16
+# Lines of sight are cached per pair of cells this big, so a still or slow
+# pair of players is ray-tested once rather than every tick
+NAV_SIGHT_CELL = 25
+
+# One graph per level grid, shared by every bot on it
+NAV_GRAPHS = weakref.WeakKeyDictionary()
+
+def nav_graph(world):
+    # The NavGraph for a World's level, compiled the first time a bot asks
+    graph = NAV_GRAPHS.get(world.grid)
+    if graph is None:
+        graph = NAV_GRAPHS[world.grid] = NavGraph(world.grid.rects, world.width, world.height, world.grid)
+    return graph
+
+def flight(jump, ticks):
+    # How far below its takeoff height a player is after each tick in the air,
+    # jumping or walking off an edge, with nothing in the way
+    floor = 10 ** 6
+    player = Player(0, floor - player_size, None)
+    # Under a light gravity a step can round to no movement, and the player
+    # only counts as standing on the ticks it is pushed back up out of the
+    # floor, so a jump is held until it takes and a fall waits until then
+    if jump:
+        while player.vertical_velocity >= 0:
+            player.move(INPUT_UP, SpatialGrid([]), floor, floor)
+    else:
+        while not player.on_ground:
+            player.move(0, SpatialGrid([]), floor, floor)
+    drop = []
+    for _ in range(ticks):
+        player.move(0, SpatialGrid([]), floor, floor * 2)
+        drop.append(player.rect.bottom - floor)
+    return np.array(drop)
+
+def air_time(drop, rise):
+    # Ticks until a player following `drop` comes down on a surface `rise` px
+    # above the one it left, or None if it never gets above that surface
+    if drop.min() > -rise:
+        return None
+    apex = int(drop.argmin())
+    t = apex + int(np.searchsorted(drop[apex:], -rise, side="right"))
+    return t + 1 if t < len(drop) else None
+
+def landing(lo, hi, x):
+    # The point of [lo, hi] nearest x, kept NAV_LANDING_INSET in from its ends
+    inset = min(NAV_LANDING_INSET, (hi - lo) // 2)
+    return min(max(x, lo + inset), hi - inset)
+
+def toward(x, goal, speed):
+    # Left or right towards goal, nothing once within a step of it
+    if goal - x >= speed:
+        return INPUT_RIGHT
+    if x - goal >= speed:
+        return INPUT_LEFT
+    return 0
+
+class NavGraph:
+    # Where a player can stand and how to get between those places, compiled
+    # once per level. Nodes are stretches of platform top (and of the floor)
+    # a player can walk along: node i runs from rect.x == lo[i] to hi[i] at
+    # rect.bottom == top[i]. Edges are the falls and jumps between them,
+    # found from the player physics and then each one flown with Player.move
+    # on the real level, so ceilings and platforms in the way are accounted for
+    def __init__(self, rects, width, height, grid=None):
+        self.width = width
+        self.height = height
+        self.grid = grid if grid is not None else SpatialGrid(rects)
+        rects = self.grid.rects
+        # Measured rather than read where possible, so they follow configure()
+        probe = Player(0, 0, None)
+        probe.move(INPUT_RIGHT, SpatialGrid([]), width, 10 ** 6)
+        self.speed = probe.rect.x
+        # Long enough to fall the whole level or NAV_MAX_DROP, whichever is more
+        ticks = (int(max(height, NAV_MAX_DROP) / physics.max_fall_speed)
+                 + 2 * int(-physics.jump_speed / physics.gravity) + 8)
+        self.jump_drop = flight(True, ticks)
+        self.fall_drop = flight(False, ticks)
+
+        # Each platform top, and the floor last, cut wherever an obstacle
+        # reaches down into the player-high band above it
+        self.top, self.lo, self.hi = [], [], []
+        self.surface = []
+        self.nodes_on = []
+        for i, rect in enumerate(rects + [pygame.Rect(0, height, width, 0)]):
+            nodes = []
+            lo, hi = max(rect.left - player_size + 1, 0), min(rect.right - 1, width - player_size)
+            band = pygame.Rect(lo, rect.top - player_size, hi - lo + player_size, player_size)
+            blocked = sorted((rects[j].left - player_size + 1, rects[j].right - 1)
+                             for j in self.grid.query(band) if band.colliderect(rects[j]))
+            for start, end in blocked + [(hi + 1, hi + 1)]:
+                if start - 1 >= lo:
+                    nodes.append(len(self.top))
+                    self.top.append(rect.top)
+                    self.lo.append(lo)
+                    self.hi.append(start - 1)
+                    self.surface.append(i)
+                lo = max(lo, end + 1)
+            self.nodes_on.append(nodes)
+        self.floor_nodes = self.nodes_on[-1]
+        # Standing lookup: the nodes at each height, sorted by lo
+        self.levels = {}
+        for i in sorted(range(len(self.top)), key=lambda i: self.lo[i]):
+            self.levels.setdefault(self.top[i], []).append(i)
+        self.level_starts = {top: [self.lo[i] for i in nodes] for top, nodes in self.levels.items()}
+
+        # edges[i] is a list of (node, kind, takeoff x, landing x, cost in ticks)
+        self.edges = [[] for _ in self.top]
+        # Anything a jump can reach, short of the floor, is within this box around a
+        rise = int(-self.jump_drop.min())
+        # With tunables that outlast the table, the longest flight it holds
+        reach = self.speed * (air_time(self.jump_drop, -NAV_MAX_DROP) or len(self.jump_drop))
+        for a in range(len(self.top)):
+            if self.surface[a] == len(rects):
+                # The floor runs under everything, so anything low enough may be a jump
+                candidates = range(len(self.top))
+            else:
+                area = (self.lo[a] - reach, self.top[a] - rise,
+                        self.hi[a] - self.lo[a] + 2 * reach, rise + NAV_MAX_DROP)
+                candidates = [b for i in self.grid.query(area) for b in self.nodes_on[i]] + self.floor_nodes
+            for b in candidates:
+                if b != a:
+                    self.add_edges(a, b)
+
+        self.top_array = np.array(self.top)
+        self.lo_array = np.array(self.lo)
+        self.hi_array = np.array(self.hi)
+        self.routes = {}
+        self.below = {}
+        self.sights = {}
+        # Searches run and surfaces expanded, for benchmarks
+        self.searches = 0
+        self.expanded = 0
+
+    def __len__(self):
+        return len(self.top)
+
+    def add_edges(self, a, b):
+        # Edges from a to b that the physics allows, each kept only if flying it works
+        top, lo, hi = self.top, self.lo, self.hi
+        rise = top[a] - top[b]
+        overlap = lo[b] <= hi[a] and lo[a] <= hi[b]
+        # Walking off whichever end of a is closer to b, when b is lower
+        if rise < 0:
+            t = air_time(self.fall_drop, rise)
+            ends = [(abs(landing(lo[b], hi[b], end) - end), takeoff, end)
+                    for takeoff, end in ((lo[a], lo[a] - 1), (hi[a], hi[a] + 1))
+                    if 0 <= end <= self.width - player_size]
+            if t is not None and ends:
+                distance, takeoff, end = min(ends)
+                if distance <= self.speed * t:
+                    self.add_edge(a, (b, NAV_FALL, takeoff, landing(lo[b], hi[b], end), 0))
+        # Jumping: up past the end of a surface above and then onto it, or
+        # across a gap to one level with or below a. Takeoff is at the end of
+        # a nearest b or, with b overhead, a step out from under b, so that
+        # anywhere within a step of it is on a and clear of b
+        if rise < 0 and overlap:
+            return
+        t = air_time(self.jump_drop, rise)
+        if t is None:
+            return
+        if hi[a] < lo[b]:
+            takeoff = hi[a]
+        elif lo[a] > hi[b]:
+            takeoff = lo[a]
+        elif lo[a] <= lo[b] - self.speed:
+            takeoff = lo[b] - self.speed
+        elif hi[a] >= hi[b] + self.speed:
+            takeoff = hi[b] + self.speed
+        else:
+            return
+        land = landing(lo[b], hi[b], takeoff)
+        if abs(land - takeoff) <= self.speed * t:
+            self.add_edge(a, (b, NAV_JUMP, takeoff, land, 0))
+
+    def add_edge(self, a, edge):
+        ticks = self.fly(a, edge)
+        if ticks is not None:
+            b, kind, takeoff, land, _ = edge
+            # Air time, plus walking from the middle of a to the takeoff
+            cost = ticks + abs(takeoff - (self.lo[a] + self.hi[a]) / 2) / self.speed
+            self.edges[a].append((b, kind, takeoff, land, cost))
+
+    def launch(self, a, edge):
+        # The input that starts taking edge from its takeoff on a
+        if edge[1] == NAV_JUMP:
+            return INPUT_UP
+        # A fall keeps walking off the end it is at
+        return INPUT_RIGHT if edge[2] == self.hi[a] else INPUT_LEFT
+
+    def steer(self, rect, edge):
+        # Left or right for a player in the air on edge: towards the landing
+        # point, but beside a surface above until clear of it, or its
+        # underside stops the jump
+        b, _, _, land, _ = edge
+        goal = land
+        if rect.bottom > self.top[b]:
+            if rect.x < self.lo[b]:
+                goal = min(land, self.lo[b] - 1)
+            elif rect.x > self.hi[b]:
+                goal = max(land, self.hi[b] + 1)
+        return toward(rect.x, goal, self.speed)
+
+    def fly(self, a, edge):
+        # Takes edge with Player.move on the level, steering the way NavBot
+        # does. Returns the ticks it took to land on the far node, or None if
+        # the player came down anywhere else
+        player = Player(edge[2], self.top[a] - player_size, None)
+        player.on_ground = True
+        start = self.launch(a, edge)
+        airborne = False
+        for tick in range(1, len(self.jump_drop) + 1):
+            inputs = start if not airborne else self.steer(player.rect, edge)
+            player.move(inputs, self.grid, self.width, self.height)
+            node = self.standing_on(player)
+            if node is None:
+                airborne = True
+                # Coming down past the far node without landing on it
+                if player.vertical_velocity > 0 and player.rect.bottom > self.top[edge[0]]:
+                    return None
+            elif airborne:
+                return tick if node == edge[0] else None
+            elif node != a:
+                return None
+        return None
+
+    def standing_on(self, player):
+        # The node player is standing on, or None in the air. Not on_ground,
+        # which under a light gravity is only set on the ticks a standing
+        # player sinks a pixel into the surface and is pushed back out
+        if player.vertical_velocity < 0:
+            return None
+        return self.node_at(player.rect)
+
+    def node_at(self, rect):
+        # The node a player standing at rect is on, or None
+        nodes = self.levels.get(rect.bottom)
+        if nodes is None:
+            return None
+        i = bisect_right(self.level_starts[rect.bottom], rect.x) - 1
+        while i >= 0:
+            node = nodes[i]
+            if rect.x <= self.hi[node]:
+                return node
+            i -= 1
+        return None
+
+    def node_below(self, rect):
+        # The first node under a player in the air; cached per 10 px, which is
+        # close enough for a goal. Outside every node, the nearest floor node
+        key = (rect.x // 10, rect.bottom // 10)
+        node = self.below.get(key)
+        if node is None:
+            x = rect.x
+            under = (self.lo_array <= x) & (self.hi_array >= x) & (self.top_array >= rect.bottom)
+            if under.any():
+                node = int(np.where(under, self.top_array, self.height + 1).argmin())
+            else:
+                node = min(self.floor_nodes, key=lambda i: max(self.lo[i] - x, 0, x - self.hi[i]))
+            if len(self.below) >= NAV_CACHE_SIZE:
+                self.below.clear()
+            self.below[key] = node
+        return node
+
+    def route(self, start, goal):
+        # The first edge on the quickest way from start to goal, or None if
+        # there is no way. Every node on a path found gets its next edge
+        # cached, so bots chasing the same target mostly hit the cache
+        key = (start, goal)
+        if key in self.routes:
+            return self.routes[key]
+        self.searches += 1
+        lo, hi, speed = self.lo, self.hi, self.speed
+
+        def estimate(node):
+            # Never more than the real cost: horizontal distance at full speed
+            return max(lo[goal] - hi[node], 0, lo[node] - hi[goal]) / speed
+
+        came = {start: None}
+        cost = {start: 0.0}
+        closed = set()
+        frontier = [(estimate(start), start)]
+        best = start
+        while frontier and len(closed) < NAV_SEARCH_LIMIT:
+            _, node = heapq.heappop(frontier)
+            if node == goal:
+                best = goal
+                break
+            if node in closed:
+                continue
+            closed.add(node)
+            if estimate(node) < estimate(best):
+                best = node
+            for edge in self.edges[node]:
+                total = cost[node] + edge[4]
+                if total < cost.get(edge[0], np.inf):
+                    cost[edge[0]] = total
+                    came[edge[0]] = (node, edge)
+                    heapq.heappush(frontier, (total + estimate(edge[0]), edge[0]))
+        self.expanded += len(closed)
+
+        if len(self.routes) >= NAV_CACHE_SIZE:
+            self.routes.clear()
+        # Walk back from the best node reached, caching each step on the way
+        node, edge = best, None
+        while came[node] is not None:
+            node, edge = came[node]
+            if best == goal:
+                self.routes[(node, goal)] = edge
+        self.routes[key] = edge
+        return edge
+
+    def clear_shot(self, x, y, target_x, target_y):
+        # True if a bullet fired from (x, y) at (target_x, target_y) gets there
+        # without hitting a platform, cached per pair of NAV_SIGHT_CELL cells
+        key = (x // NAV_SIGHT_CELL, y // NAV_SIGHT_CELL, target_x // NAV_SIGHT_CELL, target_y // NAV_SIGHT_CELL)
+        clear = self.sights.get(key)
+        if clear is None:
+            grid = self.grid
+            left, top = min(x, target_x), min(y, target_y)
+            box = (left, top, max(x, target_x) + bullet_width - left, max(y, target_y) + bullet_height - top)
+            indices = np.array(grid.query(box), dtype=np.intp)
+            # As float64, so a level shot divides by zero the way sweep_times expects
+            dx, dy = np.float64(target_x - x), np.float64(target_y - y)
+            times = sweep_times(x, y, dx, dy, bullet_width, bullet_height,
+                                grid.left[indices], grid.top[indices], grid.right[indices], grid.bottom[indices])
+            clear = bool(len(indices) == 0 or times.min() >= 1)
+            if len(self.sights) >= NAV_CACHE_SIZE:
+                self.sights.clear()
+            self.sights[key] = clear
+        return clear
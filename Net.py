@@ -0,0 +1,373 @@
+import asyncio
+import math
+import random
+import struct
+import zlib
+from Player import *
+from World import *
+from Levels import *
+
+# Wire format, little endian. Every datagram starts with its type byte.
+#   HELLO     client -> server, asks for a player slot
+#   WELCOME   server -> client: slot, level name
+#   FULL      server -> client: both slots are taken
+#   INPUT     client -> server: newest snapshot frame received (the delta
+#             baseline it can decode against), sequence number of the first
+#             input, then the newest INPUT_REDUNDANCY input masks, oldest
+#             first, so a lost datagram is covered by the next ones
+#   SNAPSHOT  server -> client: frame, baseline frame (NO_BASELINE for a full
+#             state), the last input sequence applied for each player and that
+#             input, a CRC of the full state, then the state XORed with the
+#             baseline's and deflated. Unchanged bytes XOR to zero, so a
+#             delta of a quiet tick compresses to a few bytes. Bullets never
+#             XOR to zero by themselves, as they move every tick, so both
+#             ends first advance the baseline's bullets to the new tick
+HELLO, WELCOME, FULL, INPUT, SNAPSHOT = range(1, 6)
+# Networked matches are always one-on-one: snapshots carry a slot for each
+NET_PLAYERS = 2
+INPUT_HEADER = struct.Struct("<BIIB")
+SNAPSHOT_HEADER = struct.Struct("<BII" + "i" * NET_PLAYERS + "B" * NET_PLAYERS + "I")
+NO_BASELINE = 0xFFFFFFFF
+NO_INPUT = -1
+
+INPUT_REDUNDANCY = 8
+# Received snapshots kept on the client, and sent ones on the server, as baselines
+BASELINE_HISTORY = 64
+# Inputs a client may run ahead of the server before the oldest are skipped
+MAX_INPUT_LAG = 12
+CLIENT_TIMEOUT = 5.0
+HELLO_INTERVAL = 0.5
+# Ticks the server shows a finished match before starting the next one
+RESET_DELAY = 3 * TICK_RATE
+
+def xor_bytes(data, baseline):
+    # baseline is zero padded or cut to the length of data
+    size = len(data)
+    baseline = baseline[:size].ljust(size, b"\0")
+    return (int.from_bytes(data, "little") ^ int.from_bytes(baseline, "little")).to_bytes(size, "little")
+
+def align_baseline(baseline, header):
+    # The baseline state with its bullets moved on to the tick in `header` the
+    # way Combat.update moves them, and each bullet array cut or zero padded
+    # to its bullet count, so bullets still flying line up and XOR to zero.
+    # Server and client run the same float additions and get the same bytes
+    if not baseline:
+        return baseline
+    tick, game_over, _, count = header
+    base_tick, base_over, _, n = STATE_HEADER.unpack_from(baseline)
+    offset = STATE_HEADER.size + NET_PLAYERS * PLAYER_STATE.size
+    arrays = [np.frombuffer(baseline, np.float64, n, offset + i * n * 8).copy() for i in range(4)]
+    x, y, dx, dy = arrays
+    # Bullets stand still once a match is over
+    if 0 < tick - base_tick <= BASELINE_HISTORY and not (game_over or base_over):
+        for _ in range(tick - base_tick):
+            x += dx
+            y += dy
+    arrays.append(np.frombuffer(baseline, np.uint8, n, offset + 4 * n * 8))
+    kept = min(n, count)
+    parts = [baseline[:offset]]
+    for array in arrays:
+        aligned = np.zeros(count, dtype=array.dtype)
+        aligned[:kept] = array[:kept]
+        parts.append(aligned.tobytes())
+    return b"".join(parts)
+
+def encode_delta(state, baseline):
+    aligned = align_baseline(baseline, STATE_HEADER.unpack_from(state))
+    deflate = zlib.compressobj(1, zlib.DEFLATED, -15)
+    return deflate.compress(xor_bytes(state, aligned)) + deflate.flush()
+
+def decode_delta(payload, baseline):
+    delta = zlib.decompress(payload, -15)
+    # The header is never changed by align_baseline, so it decodes on its own first
+    size = STATE_HEADER.size
+    header = STATE_HEADER.unpack(xor_bytes(delta[:size], baseline[:size]))
+    return xor_bytes(delta, align_baseline(baseline, header))
+
+class LinkConditioner:
+    # Stands in for a datagram transport and delays, jitters and drops what is
+    # sent through it, so a loopback socket behaves like a real network
+    def __init__(self, transport, latency=0.0, jitter=0.0, loss=0.0, seed=None):
+        self.transport = transport
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.sent = 0
+        self.dropped = 0
+        self.bytes = 0
+
+    def sendto(self, data, addr=None):
+        self.sent += 1
+        self.bytes += len(data)
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        delay = self.latency + self.rng.uniform(0, self.jitter)
+        if delay <= 0:
+            self.transport.sendto(data, addr)
+        else:
+            asyncio.get_running_loop().call_later(delay, self.send_later, data, addr)
+
+    def send_later(self, data, addr):
+        if not self.transport.is_closing():
+            self.transport.sendto(data, addr)
+
+    def close(self):
+        self.transport.close()
+
+class RemotePlayer:
+    # The server's view of one connected client
+    def __init__(self, addr, slot, now):
+        self.addr = addr
+        self.slot = slot
+        self.last_heard = now
+        self.inputs = {}
+        self.next_seq = 0
+        self.applied = NO_INPUT
+        self.last_input = 0
+        self.baseline = NO_BASELINE
+
+    def receive(self, first_seq, masks):
+        for seq, mask in enumerate(masks, first_seq):
+            if seq >= self.next_seq:
+                self.inputs[seq] = mask
+
+    def next_input(self):
+        # One input per tick, in sequence. A client that runs too far ahead, or
+        # lost more inputs than the redundancy covers, is skipped forward
+        if self.inputs and max(self.inputs) - self.next_seq >= MAX_INPUT_LAG:
+            self.next_seq = max(self.next_seq, max(self.inputs) - MAX_INPUT_LAG // 2)
+            self.next_seq = min(seq for seq in self.inputs if seq >= self.next_seq)
+            self.inputs = {seq: mask for seq, mask in self.inputs.items() if seq >= self.next_seq}
+        mask = self.inputs.pop(self.next_seq, None)
+        if mask is None:
+            # Nothing arrived in time: keep holding the same keys, but never repeat a shot
+            return self.last_input & ~INPUT_SHOOT
+        self.applied = self.next_seq
+        self.next_seq += 1
+        self.last_input = mask
+        return mask
+
+class GameServer(asyncio.DatagramProtocol):
+    # Runs the authoritative World at TICK_RATE and sends every client a
+    # snapshot per tick, delta compressed against the newest one it acked
+    def __init__(self, level, link=None):
+        self.level = level
+        self.link = link or {}
+        self.world = level_world(load_level(level), teams=make_teams(NET_PLAYERS, NET_PLAYERS))
+        self.players = {}
+        self.frame = 0
+        self.history = {}
+        self.over_ticks = 0
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = LinkConditioner(transport, **self.link)
+
+    def datagram_received(self, data, addr):
+        if not data:
+            return
+        now = asyncio.get_running_loop().time()
+        player = self.players.get(addr)
+        if data[0] == HELLO:
+            if player is None:
+                taken = {p.slot for p in self.players.values()}
+                free = [slot for slot in range(len(self.world.players)) if slot not in taken]
+                if not free:
+                    self.transport.sendto(bytes([FULL]), addr)
+                    return
+                player = self.players[addr] = RemotePlayer(addr, free[0], now)
+                if len(self.players) == len(self.world.players):
+                    self.world.reset()
+            level = self.level.encode()
+            self.transport.sendto(bytes([WELCOME, player.slot, len(level)]) + level, addr)
+        elif data[0] == INPUT and player is not None:
+            # A datagram shorter than its header or the inputs it declares is dropped
+            if len(data) < INPUT_HEADER.size:
+                return
+            _, baseline, first_seq, count = INPUT_HEADER.unpack_from(data)
+            if len(data) < INPUT_HEADER.size + count:
+                return
+            player.last_heard = now
+            player.baseline = baseline
+            player.receive(first_seq, data[INPUT_HEADER.size:INPUT_HEADER.size + count])
+
+    def tick(self):
+        now = asyncio.get_running_loop().time()
+        for addr, player in list(self.players.items()):
+            if now - player.last_heard > CLIENT_TIMEOUT:
+                del self.players[addr]
+
+        world = self.world
+        by_slot = {player.slot: player for player in self.players.values()}
+        inputs = [0] * len(world.players)
+        for slot, player in by_slot.items():
+            inputs[slot] = player.next_input()
+        # The match only runs with every slot filled
+        if len(by_slot) == len(world.players):
+            world.step(inputs)
+            if world.game_over:
+                self.over_ticks += 1
+                if self.over_ticks >= RESET_DELAY:
+                    world.reset()
+                    self.over_ticks = 0
+
+        self.frame += 1
+        state = world.save_state()
+        self.history[self.frame] = state
+        self.history.pop(self.frame - BASELINE_HISTORY, None)
+        applied = [by_slot[slot].applied if slot in by_slot else NO_INPUT for slot in range(NET_PLAYERS)]
+        last = [by_slot[slot].last_input if slot in by_slot else 0 for slot in range(NET_PLAYERS)]
+        crc = zlib.crc32(state)
+        for player in self.players.values():
+            baseline = self.history.get(player.baseline)
+            base_frame = player.baseline if baseline is not None else NO_BASELINE
+            payload = encode_delta(state, baseline or b"")
+            header = SNAPSHOT_HEADER.pack(SNAPSHOT, self.frame, base_frame, *applied, *last, crc)
+            self.transport.sendto(header + payload, player.addr)
+
+    async def run(self, ticks=None):
+        # Fixed rate: each tick is scheduled from the first one, so sleep
+        # overshoot doesn't add up into drift
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        count = 0
+        while ticks is None or count < ticks:
+            self.tick()
+            count += 1
+            await asyncio.sleep(max(0.0, start + count * TICK_DT - loop.time()))
+
+class GameClient(asyncio.DatagramProtocol):
+    # Predicts the local player by applying its inputs straight away, and
+    # reconciles with each server snapshot: the snapshot replaces the local
+    # World, then the inputs the server hasn't applied yet are replayed on top
+    def __init__(self, link=None):
+        self.link = link or {}
+        self.transport = None
+        self.slot = None
+        self.level = None
+        self.world = None
+        self.welcomed = asyncio.get_running_loop().create_future()
+        self.seq = 0
+        self.pending = {}
+        self.predicted = {}
+        self.remote_input = 0
+        self.snapshots = {}
+        self.frame = 0
+        # Network stats, read by the loopback harness and the HUD
+        self.received = 0
+        self.full_snapshots = 0
+        self.snapshot_bytes = 0
+        self.corrections = 0
+        self.correction_total = 0.0
+        self.correction_max = 0.0
+        self.bad_snapshots = 0
+
+    def connection_made(self, transport):
+        self.transport = LinkConditioner(transport, **self.link)
+
+    async def join(self):
+        # HELLO until the WELCOME gets through, which any lossy link needs
+        while not self.welcomed.done():
+            self.transport.sendto(bytes([HELLO]))
+            try:
+                await asyncio.wait_for(asyncio.shield(self.welcomed), HELLO_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+        return self.welcomed.result()
+
+    def datagram_received(self, data, addr):
+        if not data:
+            return
+        if data[0] == WELCOME and self.world is None:
+            self.slot = data[1]
+            self.level = data[3:3 + data[2]].decode()
+            self.world = level_world(load_level(self.level), teams=make_teams(NET_PLAYERS, NET_PLAYERS))
+            self.welcomed.set_result(self.slot)
+        elif data[0] == FULL and not self.welcomed.done():
+            self.welcomed.set_exception(ConnectionRefusedError("server is full"))
+        elif data[0] == SNAPSHOT and self.world is not None:
+            self.on_snapshot(data)
+
+    def on_snapshot(self, data):
+        _, frame, base_frame, *rest = SNAPSHOT_HEADER.unpack_from(data)
+        applied, last, crc = rest[:NET_PLAYERS], rest[NET_PLAYERS:2 * NET_PLAYERS], rest[-1]
+        # Snapshots can arrive out of order; an older one has nothing new
+        if frame <= self.frame:
+            return
+        if base_frame == NO_BASELINE:
+            baseline = b""
+            self.full_snapshots += 1
+        elif base_frame in self.snapshots:
+            baseline = self.snapshots[base_frame]
+        else:
+            return
+        state = decode_delta(data[SNAPSHOT_HEADER.size:], baseline)
+        if zlib.crc32(state) != crc:
+            # Should never happen; start over from a full state if it does
+            self.bad_snapshots += 1
+            self.snapshots.clear()
+            return
+        self.received += 1
+        self.snapshot_bytes += len(data)
+        self.frame = frame
+        self.snapshots[frame] = state
+        self.snapshots.pop(frame - BASELINE_HISTORY, None)
+        self.reconcile(state, applied[self.slot], last[1 - self.slot])
+
+    def reconcile(self, state, acked, remote_input):
+        world = self.world
+        world.load_state(state)
+        me = world.players[self.slot]
+        # How far the prediction for the last acknowledged input was off
+        predicted = self.predicted.get(acked)
+        if predicted is not None:
+            error = math.hypot(predicted[0] - me.rect.x, predicted[1] - me.rect.y)
+            if error or predicted[2] != me.vertical_velocity:
+                self.corrections += 1
+                self.correction_total += error
+                self.correction_max = max(self.correction_max, error)
+        for seq in [seq for seq in self.pending if seq <= acked]:
+            del self.pending[seq]
+            self.predicted.pop(seq, None)
+        # The other player is assumed to keep holding the same keys
+        self.remote_input = remote_input & ~INPUT_SHOOT
+        # These ticks already showed their effects when they were first predicted
+        particles, world.particles = world.particles, NULL_PARTICLES
+        for seq in sorted(self.pending):
+            self.simulate(seq, self.pending[seq])
+        world.particles = particles
+
+    def simulate(self, seq, mask):
+        inputs = [self.remote_input] * len(self.world.players)
+        inputs[self.slot] = mask
+        self.world.step(inputs)
+        me = self.world.players[self.slot]
+        self.predicted[seq] = (me.rect.x, me.rect.y, me.vertical_velocity)
+
+    def tick(self, mask):
+        # Called once per local tick with this player's INPUT_* bits
+        seq = self.seq
+        self.seq += 1
+        self.pending[seq] = mask
+        self.simulate(seq, mask)
+        first = max(seq - INPUT_REDUNDANCY + 1, min(self.pending))
+        masks = bytes(self.pending.get(s, 0) for s in range(first, seq + 1))
+        baseline = self.frame if self.frame in self.snapshots else NO_BASELINE
+        self.transport.sendto(INPUT_HEADER.pack(INPUT, baseline, first, len(masks)) + masks)
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+
+async def start_server(level, host="0.0.0.0", port=0, link=None):
+    loop = asyncio.get_running_loop()
+    transport, server = await loop.create_datagram_endpoint(lambda: GameServer(level, link), local_addr=(host, port))
+    return server, transport.get_extra_info("sockname")[1]
+
+async def connect(host, port, link=None):
+    loop = asyncio.get_running_loop()
+    _, client = await loop.create_datagram_endpoint(lambda: GameClient(link), remote_addr=(host, port))
+    await client.join()
+    return client
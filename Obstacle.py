@@ -6,8 +6,11 @@ BLACK = (0, 0, 0)
 BROWN = (100, 40, 0)
 
 class Obstacle:
+    __slots__ = ("rect",)
+
     def __init__(self, x, y, width, height):
         self.rect = pygame.Rect(x, y, width, height)
         
-    def draw(self, win):
-        pygame.draw.rect(win, BROWN, self.rect)
\ No newline at end of file
+    def draw(self, win, offset=(0, 0)):
+        # offset is the world position of the surface's top left corner
+        pygame.draw.rect(win, BROWN, self.rect.move(-offset[0], -offset[1]))
\ No newline at end of file
@@ -2,57 +2,92 @@ import pygame
 import sys
 import math
 
+# Default arena size; a World can be any size
 WIDTH, HEIGHT = 1000, 750
-win = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Two Player Shooter")
 
 # Define colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
 BLUE = (0, 0, 255)
+GREEN = (0, 170, 0)
+YELLOW = (230, 200, 0)
+PURPLE = (150, 0, 200)
+CYAN = (0, 190, 200)
+PINK = (255, 105, 180)
 EXPLOSION_COLOR = (255, 165, 0)
 GRAY = (200, 200, 200)
+# Players wear their team's color, cycling when there are more teams than colors
+TEAM_COLORS = [RED, BLUE, GREEN, YELLOW, PURPLE, CYAN, PINK]
 
 # Define player and bullet properties
 player_size = 50
 player_speed = 5
 bullet_speed = 7
+bullet_width = 10
+bullet_height = 5
 explosion_radius = 50
 explosion_duration = 30
 gravity = 0.5
 jump_speed = -15
 max_fall_speed = 10
+player_health = 3
+
+# Constants a balance run may override with configure(), and their defaults
+TUNABLES = {
+    "player_speed": player_speed,
+    "player_health": player_health,
+    "bullet_speed": bullet_speed,
+    "gravity": gravity,
+    "jump_speed": jump_speed,
+    "max_fall_speed": max_fall_speed,
+}
+
+# Per-tick input bits for one player, so the simulation never sees the keyboard
+INPUT_UP = 1
+INPUT_DOWN = 2
+INPUT_LEFT = 4
+INPUT_RIGHT = 8
+INPUT_SHOOT = 16
+
+def configure(**params):
+    # Sets the tunables for every Player in this process; any not given go back
+    # to their defaults. Only this module reads them during a tick, so the copies
+    # other modules get from `import *` never matter
+    unknown = set(params) - set(TUNABLES)
+    if unknown:
+        raise ValueError(f"unknown tunables: {', '.join(sorted(unknown))}")
+    globals().update(TUNABLES)
+    globals().update(params)
 
 class Player:
+    # Fixed attributes, no per-instance __dict__
+    __slots__ = ("rect", "color", "health", "exploding", "explosion_frame", "vertical_velocity", "on_ground")
+
     def __init__(self, x, y, color):
         self.rect = pygame.Rect(x, y, player_size, player_size)
         self.color = color
-        self.bullets = []
-        self.health = 3  # Each player starts with 3 health points
+        self.health = player_health  # Each player starts with 3 health points by default
         self.exploding = False
         self.explosion_frame = 0
         self.vertical_velocity = 0
         self.on_ground = False
 
-    def draw(self, win):
-        if self.exploding:
-            self.explode(win)
-        else:
-            pygame.draw.rect(win, self.color, self.rect)
-            for bullet in self.bullets:
-                pygame.draw.rect(win, self.color, bullet['rect'])
+    def draw(self, win, offset=(0, 0)):
+        # Returns the area drawn over, for dirty-rect updates. offset is the
+        # world position of the window's top left corner
+        return pygame.draw.rect(win, self.color, self.rect.move(-offset[0], -offset[1]))
 
-    def move(self, keys, up, down, left, right, obstacles):
+    def move(self, inputs, obstacles, width, height):
         if not self.exploding:
             # Horizontal movement
-            if keys[left]:
+            if inputs & INPUT_LEFT:
                 self.rect.x -= player_speed
-                if self.rect.x < 0 or self.rect.collidelist(obstacles) != -1:
+                if self.rect.x < 0 or obstacles.collide(self.rect) != -1:
                     self.rect.x += player_speed
-            if keys[right]:
+            if inputs & INPUT_RIGHT:
                 self.rect.x += player_speed
-                if self.rect.x + player_size > WIDTH or self.rect.collidelist(obstacles) != -1:
+                if self.rect.x + player_size > width or obstacles.collide(self.rect) != -1:
                     self.rect.x -= player_speed
 
             # Apply gravity
@@ -63,12 +98,12 @@ class Player:
 
             # Check for collisions with the ground and obstacles
             self.on_ground = False
-            if self.rect.y + player_size > HEIGHT:
-                self.rect.y = HEIGHT - player_size
+            if self.rect.y + player_size > height:
+                self.rect.y = height - player_size
                 self.vertical_velocity = 0
                 self.on_ground = True
-            elif self.rect.collidelist(obstacles) != -1:
-                for obs in obstacles:
+            elif obstacles.collide(self.rect) != -1:
+                for obs in obstacles.nearby(self.rect):
                     if self.rect.colliderect(obs):
                         if self.vertical_velocity > 0:  # Falling
                             self.rect.bottom = obs.top
@@ -79,37 +114,20 @@ class Player:
                             self.vertical_velocity = 0
 
             # Jumping
-            if keys[up] and self.on_ground:
+            if inputs & INPUT_UP and self.on_ground:
                 self.vertical_velocity = jump_speed
 
-    def shoot(self, target_pos):
+    def shoot(self, target_pos, bullets, owner):
         if not self.exploding:
-            bullet_rect = pygame.Rect(self.rect.centerx, self.rect.centery, 10, 5)
             dir_x, dir_y = target_pos[0] - self.rect.centerx, target_pos[1] - self.rect.centery
             distance = math.sqrt(dir_x**2 + dir_y**2)
             if distance == 0:
                 dir_x, dir_y = 0, 0
             else:
                 dir_x, dir_y = dir_x / distance, dir_y / distance
-            bullet = {'rect': bullet_rect, 'dir': (dir_x, dir_y)}
-            self.bullets.append(bullet)
-
-    def handle_bullets(self, opponent, obstacles):
-        for bullet in self.bullets[:]:
-            bullet['rect'].x += bullet['dir'][0] * bullet_speed
-            bullet['rect'].y += bullet['dir'][1] * bullet_speed
-            if bullet['rect'].colliderect(opponent.rect):
-                self.bullets.remove(bullet)
-                opponent.health -= 1
-            elif bullet['rect'].collidelist(obstacles) != -1:
-                self.bullets.remove(bullet)
-            elif bullet['rect'].x > WIDTH or bullet['rect'].x < 0 or bullet['rect'].y > HEIGHT or bullet['rect'].y < 0:
-                self.bullets.remove(bullet)
+            bullets.spawn(self.rect.centerx, self.rect.centery, dir_x * bullet_speed, dir_y * bullet_speed, owner)
 
-    def explode(self, win):
-        if self.explosion_frame < explosion_duration:
-            radius = explosion_radius * (self.explosion_frame / explosion_duration)
-            pygame.draw.circle(win, EXPLOSION_COLOR, self.rect.center, int(radius))
+    def update_explosion(self):
+        # The explosion plays once; the player then stays exploded, out of the match
+        if self.exploding and self.explosion_frame < explosion_duration:
             self.explosion_frame += 1
-        else:
-            self.exploding = False
\ No newline at end of file
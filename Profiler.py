@@ -0,0 +1,183 @@
+import csv
+import json
+import time
+from collections import deque
+import pygame
+
+# Frames kept for the overlay's numbers and histogram
+PROFILE_HISTORY = 240
+HISTOGRAM_BUCKET_MS = 2
+HISTOGRAM_BUCKETS = 20
+HISTOGRAM_HEIGHT = 60
+# The overlay is re-rendered every few frames, not every frame
+OVERLAY_REFRESH = 10
+OVERLAY_FONT_SIZE = 20
+OVERLAY_BACKGROUND = (0, 0, 0, 160)
+OVERLAY_TEXT = (255, 255, 255)
+FRAME_BUDGET_MS = 1000 / 60
+
+class Scope:
+    # Adds the time spent inside the with block to the current frame's total for its name
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+
+class NullScope:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+class NullProfiler:
+    # Stands in when profiling is off, so hot paths never have to check
+    scope_instance = NullScope()
+
+    def scope(self, name):
+        return self.scope_instance
+
+    def count(self, name, n=1):
+        pass
+
+    def gauge(self, name, value):
+        pass
+
+    def begin_frame(self):
+        pass
+
+    def end_frame(self):
+        pass
+
+NULL_PROFILER = NullProfiler()
+
+class Profiler:
+    def __init__(self, record=False):
+        self.scopes = {}
+        self.times = {}
+        self.counters = {}
+        self.history = deque(maxlen=PROFILE_HISTORY)
+        # Every frame is kept only when it is going to be exported
+        self.record = record
+        self.frames = []
+        self.frame = 0
+        self.frame_start = None
+        self.interval = 0.0
+
+    def scope(self, name):
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = Scope(self, name)
+        return scope
+
+    def add(self, name, seconds):
+        self.times[name] = self.times.get(name, 0.0) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        # A level rather than a tally, e.g. live bullets; the last value in a frame wins
+        self.counters[name] = value
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        # Begin to begin, so the frame cap sleep is counted in the frame it ended
+        self.interval = now - self.frame_start if self.frame_start is not None else 0.0
+        self.frame_start = now
+        self.times.clear()
+        self.counters.clear()
+
+    def end_frame(self):
+        now = time.perf_counter()
+        # frame_ms is wall time since the previous frame began, busy_ms excludes the frame cap sleep
+        busy = now - self.frame_start
+        stats = {"frame": self.frame, "frame_ms": max(self.interval, busy) * 1000, "busy_ms": busy * 1000}
+        for name, seconds in self.times.items():
+            stats[f"{name}_ms"] = seconds * 1000
+        stats.update(self.counters)
+        self.history.append(stats)
+        if self.record:
+            self.frames.append(stats)
+        self.frame += 1
+
+    def export(self, path):
+        # CSV or JSON, picked by the file extension
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump(self.frames, f)
+            return
+        columns = []
+        for stats in self.frames:
+            columns.extend(key for key in stats if key not in columns)
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, restval=0)
+            writer.writeheader()
+            writer.writerows(self.frames)
+
+class ProfileOverlay:
+    # On-screen FPS, phase timings, counters and a frame-time histogram
+    def __init__(self, profiler, text_cache):
+        self.profiler = profiler
+        self.font = text_cache.font(None, OVERLAY_FONT_SIZE)
+        self.visible = False
+        self.surface = None
+        self.age = OVERLAY_REFRESH
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.age = OVERLAY_REFRESH
+
+    def lines(self):
+        history = self.profiler.history
+        frames = len(history)
+        frame_ms = sum(stats["frame_ms"] for stats in history) / frames
+        lines = [f"FPS {1000 / max(frame_ms, 1e-6):.0f}  frame {frame_ms:.2f} ms"]
+        latest = history[-1]
+        ticks = max(latest.get("ticks", 0), 1)
+        for key, value in latest.items():
+            if key.endswith("_ms") and key != "frame_ms":
+                lines.append(f"{key[:-3]:<12} {value:6.2f} ms")
+        lines.append(f"bullets {latest.get('bullets', 0)}")
+        lines.append(f"collision tests/tick {latest.get('collision tests', 0) // ticks}")
+        return lines
+
+    def render(self):
+        history = self.profiler.history
+        lines = self.lines()
+        line_height = self.font.get_linesize()
+        width = max(HISTOGRAM_BUCKETS * 8, max(self.font.size(line)[0] for line in lines)) + 10
+        height = line_height * len(lines) + HISTOGRAM_HEIGHT + 15
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.fill(OVERLAY_BACKGROUND)
+        for i, line in enumerate(lines):
+            surface.blit(self.font.render(line, True, OVERLAY_TEXT), (5, 5 + i * line_height))
+
+        # Histogram of frame times, in HISTOGRAM_BUCKET_MS buckets; the last bucket collects the rest
+        buckets = [0] * HISTOGRAM_BUCKETS
+        for stats in history:
+            buckets[min(int(stats["frame_ms"] // HISTOGRAM_BUCKET_MS), HISTOGRAM_BUCKETS - 1)] += 1
+        tallest = max(buckets)
+        base = height - 5
+        for i, count in enumerate(buckets):
+            bar = HISTOGRAM_HEIGHT * count // tallest
+            over_budget = i * HISTOGRAM_BUCKET_MS >= FRAME_BUDGET_MS
+            color = (230, 60, 60) if over_budget else (60, 220, 90)
+            pygame.draw.rect(surface, color, (5 + i * 8, base - bar, 6, bar))
+        return surface
+
+    def overlay(self, position=(10, 50)):
+        # Returns a (surface, position) overlay entry, or None while hidden
+        if not self.visible or not self.profiler.history:
+            return None
+        self.age += 1
+        if self.age >= OVERLAY_REFRESH:
+            self.surface = self.render()
+            self.age = 0
+        return self.surface, position
@@ -0,0 +1,105 @@
+import pygame
+from Assets import *
+from Camera import *
+from Effects import *
+from Profiler import *
+
+# Past this many changed rects a frame, one full-window update is cheaper
+DIRTY_LIMIT = 200
+
+# Every renderer takes the same calls: draw(world, overlays) once per frame,
+# set_level(obstacles) when the layout changes and invalidate() to force a
+# full repaint, and has a camera that decides which part of the world the
+# window shows. None of them may change the World they are given.
+RENDERERS = ("software", "opengl", "null")
+
+# width and height are the window's. background is a decoded, unconverted
+# surface of that size, such as one from AssetLoader.load(), and is tiled
+# across worlds bigger than the window. world_size defaults to the window's
+def create_renderer(name, width, height, background, obstacles, world_size=None):
+    camera = Camera(width, height, *(world_size or (width, height)))
+    if name == "null":
+        return NullRenderer(camera)
+    if name == "opengl":
+        # PyOpenGL is only needed for this backend
+        from GLRenderer import GLRenderer
+        return GLRenderer(camera, background, obstacles)
+    win = pygame.display.set_mode(camera.size)
+    layer = StaticLayer(background.convert())
+    return DirtyRenderer(win, layer, obstacles, camera)
+
+class NullRenderer:
+    # Draws nothing, for headless runs of the normal game loop
+    profiler = NULL_PROFILER
+
+    def __init__(self, camera):
+        self.camera = camera
+
+    def set_level(self, obstacles):
+        pass
+
+    def invalidate(self):
+        pass
+
+    def draw(self, world, overlays):
+        pass
+
+class DirtyRenderer:
+    # Software renderer that only repaints and presents what moved: last
+    # frame's rects are restored from the background, then this frame's
+    # sprites are drawn and both sets are handed to display.update
+    profiler = NULL_PROFILER
+
+    def __init__(self, win, layer, obstacles, camera):
+        self.win = win
+        # Obstacles never move, so they come pre-baked into the static layer
+        self.layer = layer
+        self.camera = camera
+        self.previous = []
+        self.set_level(obstacles)
+
+    def set_level(self, obstacles):
+        self.layer.build(obstacles)
+        self.invalidate()
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def draw(self, world, overlays):
+        # overlays is a list of (surface, position) drawn on top, such as the HUD
+        win = self.win
+        layer = self.layer
+        # A scrolled view repaints everything, like a layout change
+        moved = self.camera.follow(world.players)
+        view = self.camera.rect
+        offset = view.topleft
+        full = (self.full_redraw or moved
+                or len(self.previous) + len(world.bullets) + len(world.particles) > DIRTY_LIMIT)
+        if full:
+            layer.blit(win, view, offset)
+            layer.evict(view)
+        else:
+            for rect in self.previous:
+                layer.blit(win, rect.move(offset), offset)
+
+        # Everything outside the view is culled before it reaches a draw call
+        current = world.particles.draw(win, view)
+        if world.particles is NULL_PARTICLES:
+            current.extend(world.explosions.draw(win, view))
+        current.extend(player.draw(win, offset) for player in world.players
+                       if not player.exploding and player.rect.colliderect(view))
+        current.extend(world.bullets.draw(win, world.players, view))
+        for surface, position in overlays:
+            current.append(win.blit(surface, position))
+
+        self.present(full, self.previous + current)
+        self.previous = current
+        self.full_redraw = False
+
+    def present(self, full, rects):
+        # rects are the areas changed since the last frame, for a partial update
+        with self.profiler.scope("present"):
+            if full:
+                pygame.display.update()
+            else:
+                pygame.display.update(rects)
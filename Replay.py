@@ -0,0 +1,119 @@
+import struct
+
+# File layout, little endian:
+#   magic, version, player count, team count, level name length, level name,
+#   tick count (u32), world checksum after the last tick (u32),
+#   then runs of (run length, input word XOR previous word), both as varints.
+# An input word is a reset flag in bit 0 followed by each player's INPUT_*
+# bits in turn, so held keys cost nothing until they change. Players are
+# dealt into teams in turn, as World.make_teams does. Version 1 files have no
+# team count and are always one-on-one
+REPLAY_MAGIC = b"TPSR"
+REPLAY_VERSION = 2
+PLAYER_BITS = 5
+RESET_FLAG = 1
+
+def pack_inputs(inputs, reset=False):
+    word = RESET_FLAG if reset else 0
+    for i, mask in enumerate(inputs):
+        word |= mask << (1 + i * PLAYER_BITS)
+    return word
+
+def unpack_inputs(word, players):
+    mask = (1 << PLAYER_BITS) - 1
+    return [(word >> (1 + i * PLAYER_BITS)) & mask for i in range(players)]
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+class ReplayRecorder:
+    # Run-length encodes input words as they are recorded, one per tick
+    def __init__(self, level, players=2, teams=2):
+        self.level = level
+        self.players = players
+        self.teams = teams
+        self.ticks = 0
+        self.runs = bytearray()
+        self.previous = 0
+        self.word = None
+        self.run = 0
+        self.reset_pending = False
+
+    def mark_reset(self):
+        # The world was reset; flag the next recorded tick so playback resets too
+        self.reset_pending = True
+
+    def record(self, inputs):
+        word = pack_inputs(inputs, self.reset_pending)
+        self.reset_pending = False
+        self.ticks += 1
+        if word == self.word:
+            self.run += 1
+            return
+        self.flush_run()
+        self.word = word
+        self.run = 1
+
+    def flush_run(self):
+        if self.run:
+            write_varint(self.runs, self.run)
+            write_varint(self.runs, self.word ^ self.previous)
+            self.previous = self.word
+            self.run = 0
+
+    def save(self, path, checksum):
+        self.flush_run()
+        level = self.level.encode()
+        with open(path, "wb") as f:
+            f.write(REPLAY_MAGIC)
+            f.write(struct.pack("<BBBB", REPLAY_VERSION, self.players, self.teams, len(level)))
+            f.write(level)
+            f.write(struct.pack("<II", self.ticks, checksum))
+            f.write(self.runs)
+
+class Replay:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != REPLAY_MAGIC:
+            raise ValueError(f"{path} is not a replay file")
+        version, self.players = struct.unpack_from("<BB", data, 4)
+        if version == 1:
+            self.teams = 2
+            start = 7
+        elif version == REPLAY_VERSION:
+            self.teams = data[6]
+            start = 8
+        else:
+            raise ValueError(f"{path} is replay version {version}, expected {REPLAY_VERSION}")
+        pos = start + data[start - 1]
+        self.level = data[start:pos].decode()
+        self.ticks, self.checksum = struct.unpack_from("<II", data, pos)
+        self.runs = data[pos + 8:]
+
+    def __iter__(self):
+        # Yields (reset, inputs) for every tick
+        data = self.runs
+        pos = 0
+        word = 0
+        while pos < len(data):
+            run, pos = read_varint(data, pos)
+            delta, pos = read_varint(data, pos)
+            word ^= delta
+            reset = bool(word & RESET_FLAG)
+            inputs = unpack_inputs(word, self.players)
+            for _ in range(run):
+                yield reset, inputs
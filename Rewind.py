@@ -0,0 +1,59 @@
+from World import *
+
+# How much of the match the window keeps for rewinding
+REWIND_SECONDS = 5
+
+class Rewind:
+    # The last few seconds of a World, one save_state() per recorded tick in a
+    # ring of buffers allocated up front. A buffer only grows, to twice what
+    # it had to hold, when a state with more bullets than it has room for
+    # comes round; after that recording allocates nothing
+    def __init__(self, world, seconds=REWIND_SECONDS, every=1):
+        # every: record only ticks that are a multiple of this, for longer rings
+        self.every = every
+        slots = max(int(seconds * TICK_RATE) // every, 1)
+        size = world.state_size()
+        self.buffers = [bytearray(size) for _ in range(slots)]
+        self.ticks = [0] * slots
+        # Next slot to write, and how many hold a state
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def record(self, world):
+        # Call after each step; a reset world should be clear()ed first so the
+        # ring doesn't reach back into the previous match
+        if world.tick % self.every:
+            return
+        size = world.state_size()
+        if len(self.buffers[self.head]) < size:
+            self.buffers[self.head] = bytearray(size * 2)
+        world.save_state(self.buffers[self.head])
+        self.ticks[self.head] = world.tick
+        self.head = (self.head + 1) % len(self.buffers)
+        self.count = min(self.count + 1, len(self.buffers))
+
+    def oldest(self):
+        # Tick of the earliest state held, or None when empty
+        if not self.count:
+            return None
+        return self.ticks[(self.head - self.count) % len(self.buffers)]
+
+    def rewind(self, world, ticks):
+        # Puts world back to the latest state held at least `ticks` before its
+        # current tick, or the oldest one if it doesn't reach that far, and
+        # forgets everything newer. Returns the tick restored, or None when empty
+        goal = world.tick - ticks
+        while self.count:
+            slot = (self.head - 1) % len(self.buffers)
+            if self.ticks[slot] <= goal or self.count == 1:
+                world.load_state(self.buffers[slot])
+                return world.tick
+            self.head = slot
+            self.count -= 1
+        return None
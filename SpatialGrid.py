@@ -0,0 +1,217 @@
+import numpy as np
+import pygame
+
+# A little bigger than a player, so most queries land in one to four cells
+CELL_SIZE = 100
+# Levels with this few obstacles are faster to scan than to index
+LINEAR_LIMIT = 16
+# (rect, cell) pairs a grid sweep takes at a time, which bounds its
+# temporaries on crowded levels where every cell holds dozens of obstacles
+SWEEP_CHUNK = 2048
+
+def sweep_times(x, y, dx, dy, w, h, left, top, right, bottom):
+    # Slab test for a w x h box moving from (x, y) by (dx, dy) this tick against
+    # rects given by their edges. Returns the entry time in [0, 1], or inf where
+    # the box never overlaps the rect, so nothing fast can tunnel through.
+    # A still axis divides by zero into +-inf slabs; the NaN from 0 * inf only
+    # happens when exactly touching an edge, and fmin/fmax drop it as a miss
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv_x, inv_y = 1 / dx, 1 / dy
+        tx1, tx2 = (left - w - x) * inv_x, (right - x) * inv_x
+        ty1, ty2 = (top - h - y) * inv_y, (bottom - y) * inv_y
+    enter = np.fmax(np.fmin(tx1, tx2), np.fmin(ty1, ty2))
+    leave = np.fmin(np.fmax(tx1, tx2), np.fmax(ty1, ty2))
+    hit = (enter < leave) & (enter < 1) & (leave > 0)
+    return np.where(hit, np.maximum(enter, 0), np.inf)
+
+class SpatialGrid:
+    # Static uniform grid over the obstacle rects, built once per level.
+    # A compiled level passes its cells in ready-made
+    def __init__(self, rects, cell_size=CELL_SIZE, cells=None):
+        self.rects = [pygame.Rect(rect) for rect in rects]
+        self.cell_size = cell_size
+        if cells is None:
+            cells = {}
+            for i, rect in enumerate(self.rects):
+                for cell in self.cells_for(rect):
+                    cells.setdefault(cell, []).append(i)
+        self.cells = cells
+
+        # Edges as arrays for the vectorized queries. The extra last entry is a
+        # rect out at infinity that nothing reaches, used as padding (index -1)
+        self.left = np.array([r.left for r in self.rects] + [np.inf])
+        self.top = np.array([r.top for r in self.rects] + [np.inf])
+        self.right = np.array([r.right for r in self.rects] + [np.inf])
+        self.bottom = np.array([r.bottom for r in self.rects] + [np.inf])
+        self.table = None
+        # Running count of rect-vs-obstacle tests, read by the profiler
+        self.tests = 0
+
+    def __len__(self):
+        return len(self.rects)
+
+    def cells_for(self, rect):
+        # rect may be a pygame.Rect or any (x, y, w, h) with float coordinates
+        x, y, w, h = rect
+        size = self.cell_size
+        x0, x1 = int(x // size), int((x + w) // size)
+        y0, y1 = int(y // size), int((y + h) // size)
+        return [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+
+    def query(self, rect):
+        # Indices of every obstacle sharing a cell with rect, in list order
+        x, y, w, h = rect
+        size = self.cell_size
+        x0, x1 = int(x // size), int((x + w) // size)
+        y0, y1 = int(y // size), int((y + h) // size)
+        if x0 == x1 and y0 == y1:
+            return self.cells.get((x0, y0), ())
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                found.update(self.cells.get((cx, cy), ()))
+        return sorted(found)
+
+    def nearby(self, rect):
+        return [self.rects[i] for i in self.query(rect)]
+
+    def collide(self, rect):
+        # Same contract as Rect.collidelist: first colliding index, or -1
+        if len(self.rects) <= LINEAR_LIMIT:
+            # Rect.collidelist runs in C and beats the cell lookup on tiny levels
+            self.tests += len(self.rects)
+            return rect.collidelist(self.rects)
+        for i in self.query(rect):
+            self.tests += 1
+            if rect.colliderect(self.rects[i]):
+                return i
+        return -1
+
+    def build_table(self):
+        # Dense (rows, cols, depth) copy of the cells, padded with -1
+        cols = [cx for cx, cy in self.cells]
+        rows = [cy for cx, cy in self.cells]
+        table_x, table_y = min(cols, default=0), min(rows, default=0)
+        depth = max((len(indices) for indices in self.cells.values()), default=1)
+        table = np.full((max(rows, default=0) - table_y + 1, max(cols, default=0) - table_x + 1, depth), -1, dtype=np.intp)
+        for (cx, cy), indices in self.cells.items():
+            table[cy - table_y, cx - table_x, :len(indices)] = indices
+        self.set_table(table, table_x, table_y)
+
+    def set_table(self, table, table_x, table_y):
+        # table is the dense copy of the cells whose first cell is (table_x, table_y)
+        self.table = table
+        self.table_x, self.table_y = table_x, table_y
+        # One row per cell, and a last row of padding for the cells off the table
+        depth = table.shape[2]
+        self.flat = np.vstack([table.reshape(-1, depth), np.full((1, depth), -1, dtype=table.dtype)])
+
+    def offsets(self, left, top, right, bottom):
+        # Yields (cell, valid) per cell offset, covering every cell each box
+        # touches; boxes are given as arrays of their edges. cell is a row of
+        # self.flat, and only means anything where valid
+        if self.table is None:
+            self.build_table()
+        size = self.cell_size
+        rows, cols, depth = self.table.shape
+        cx0 = (left // size).astype(np.intp) - self.table_x
+        cy0 = (top // size).astype(np.intp) - self.table_y
+        cx1 = (right // size).astype(np.intp) - self.table_x
+        cy1 = (bottom // size).astype(np.intp) - self.table_y
+        for ox in range(int((cx1 - cx0).max()) + 1):
+            for oy in range(int((cy1 - cy0).max()) + 1):
+                cx, cy = cx0 + ox, cy0 + oy
+                valid = (cx <= cx1) & (cy <= cy1) & (cx >= 0) & (cx < cols) & (cy >= 0) & (cy < rows)
+                if valid.any():
+                    yield cy * cols + cx, valid
+
+    def candidates(self, left, top, right, bottom):
+        # Yields an (n, depth) array of obstacle indices per cell offset
+        for cell, valid in self.offsets(left, top, right, bottom):
+            yield self.flat[np.where(valid, cell, len(self.flat) - 1)]
+
+    def cell_pairs(self, left, top, right, bottom):
+        # Every box paired with each cell it touches that holds an obstacle, as
+        # an array of box indices and one of self.flat rows
+        boxes, cells = [np.zeros(0, dtype=np.intp)], [np.zeros(0, dtype=np.intp)]
+        for cell, valid in self.offsets(left, top, right, bottom):
+            found = np.flatnonzero(valid)
+            found = found[self.flat[cell[found], 0] >= 0]
+            boxes.append(found)
+            cells.append(cell[found])
+        return np.concatenate(boxes), np.concatenate(cells)
+
+    def overlaps(self, x, y, w, h):
+        # Vectorized collide for many w x h rects at once: True where any obstacle is hit
+        if len(x) == 0:
+            return np.zeros(0, dtype=bool)
+        right, bottom = x + w, y + h
+        if len(self.rects) <= LINEAR_LIMIT:
+            self.tests += len(x) * len(self.rects)
+            return ((x[:, None] < self.right) & (right[:, None] > self.left) &
+                    (y[:, None] < self.bottom) & (bottom[:, None] > self.top)).any(axis=1)
+        hit = np.zeros(len(x), dtype=bool)
+        for indices in self.candidates(x, y, right, bottom):
+            self.tests += indices.size
+            hit |= ((x[:, None] < self.right[indices]) & (right[:, None] > self.left[indices]) &
+                    (y[:, None] < self.bottom[indices]) & (bottom[:, None] > self.top[indices])).any(axis=1)
+        return hit
+
+    def first_overlap(self, x, y, w, h):
+        # Vectorized collide for many w x h rects: the lowest obstacle index each
+        # rect hits, which is the one Player.move resolves against, or -1
+        n = len(self.rects)
+        if len(x) == 0:
+            return np.zeros(0, dtype=np.intp)
+        right, bottom = x + w, y + h
+        if n <= LINEAR_LIMIT:
+            self.tests += len(x) * n
+            hit = ((x[:, None] < self.right) & (right[:, None] > self.left) &
+                   (y[:, None] < self.bottom) & (bottom[:, None] > self.top))
+            return np.where(hit.any(axis=1), hit.argmax(axis=1), -1)
+        # Misses and padding count as index n, the sentinel, until the end
+        first = np.full(len(x), n, dtype=np.intp)
+        for indices in self.candidates(x, y, right, bottom):
+            self.tests += indices.size
+            hit = ((x[:, None] < self.right[indices]) & (right[:, None] > self.left[indices]) &
+                   (y[:, None] < self.bottom[indices]) & (bottom[:, None] > self.top[indices]))
+            np.minimum(first, np.where(hit, indices, n).min(axis=1), out=first)
+        first[first == n] = -1
+        return first
+
+    def sweep(self, x, y, dx, dy, w, h):
+        # Earliest time in [0, 1] at which each moving w x h rect touches any obstacle, inf if none
+        if len(x) == 0:
+            return np.zeros(0)
+        first = np.full(len(x), np.inf)
+        left, top = np.minimum(x, x + dx), np.minimum(y, y + dy)
+        right, bottom = np.maximum(x, x + dx) + w, np.maximum(y, y + dy) + h
+        if len(self.rects) <= LINEAR_LIMIT:
+            # Only pairs whose swept box overlaps the obstacle can hit, and with
+            # thousands of bullets the cheap box test skips nearly all the slab math
+            self.tests += len(x) * len(self.rects)
+            near = ((left[:, None] < self.right[:-1]) & (right[:, None] > self.left[:-1]) &
+                    (top[:, None] < self.bottom[:-1]) & (bottom[:, None] > self.top[:-1]))
+            rows, cols = np.nonzero(near)
+            if len(rows):
+                times = sweep_times(x[rows], y[rows], dx[rows], dy[rows], w, h,
+                                    self.left[cols], self.top[cols], self.right[cols], self.bottom[cols])
+                np.minimum.at(first, rows, times)
+            return first
+        # Each swept box only meets the obstacles of the cells it touches, and
+        # of those only the ones passing the same box test reach the slab math
+        boxes, cells = self.cell_pairs(left, top, right, bottom)
+        for start in range(0, len(boxes), SWEEP_CHUNK):
+            rows = boxes[start:start + SWEEP_CHUNK]
+            indices = self.flat[cells[start:start + SWEEP_CHUNK]]
+            self.tests += indices.size
+            near = ((left[rows, None] < self.right[indices]) & (right[rows, None] > self.left[indices]) &
+                    (top[rows, None] < self.bottom[indices]) & (bottom[rows, None] > self.top[indices]))
+            pairs, slots = np.nonzero(near)
+            if not len(pairs):
+                continue
+            rows, cols = rows[pairs], indices[pairs, slots]
+            times = sweep_times(x[rows], y[rows], dx[rows], dy[rows], w, h,
+                                self.left[cols], self.top[cols], self.right[cols], self.bottom[cols])
+            np.minimum.at(first, rows, times)
+        return first
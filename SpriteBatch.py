@@ -0,0 +1,100 @@
+import math
+import numpy as np
+from OpenGL.GL import *
+
+# Vertices reserved up front per primitive type; doubled when a frame needs more
+BATCH_CAPACITY = 4096
+CIRCLE_SEGMENTS = 36
+
+def rgba(color):
+    # Colors are RGB or RGBA floats in [0, 1]; RGB ones are opaque
+    return tuple(color) if len(color) == 4 else tuple(color) + (1.0,)
+
+class VertexBatch:
+    # Flat-colored RGBA vertices for one primitive type, packed into NumPy arrays
+    def __init__(self, mode, capacity=BATCH_CAPACITY):
+        self.mode = mode
+        self.vertices = np.zeros((capacity, 2), dtype=np.float32)
+        self.colors = np.zeros((capacity, 4), dtype=np.float32)
+        self.count = 0
+
+    def reserve(self, n):
+        # Returns the slice the next n vertices go into, growing the arrays if needed
+        end = self.count + n
+        if end > len(self.vertices):
+            capacity = max(end, len(self.vertices) * 2)
+            for name in ("vertices", "colors"):
+                old = getattr(self, name)
+                new = np.zeros((capacity, old.shape[1]), dtype=np.float32)
+                new[:self.count] = old[:self.count]
+                setattr(self, name, new)
+        start = self.count
+        self.count = end
+        return slice(start, end)
+
+    def flush(self):
+        # One draw call for everything collected this frame
+        if self.count == 0:
+            return 0
+        glVertexPointer(2, GL_FLOAT, 0, self.vertices[:self.count])
+        glColorPointer(4, GL_FLOAT, 0, self.colors[:self.count])
+        glDrawArrays(self.mode, 0, self.count)
+        self.count = 0
+        return 1
+
+class SpriteBatch:
+    # Collects every untextured quad and circle of a frame and submits them
+    # with one glDrawArrays per primitive type, instead of a glBegin/glEnd per shape
+    def __init__(self, capacity=BATCH_CAPACITY):
+        self.quads = VertexBatch(GL_QUADS, capacity)
+        self.triangles = VertexBatch(GL_TRIANGLES, capacity)
+        self.draw_calls = 0
+        angles = np.linspace(0, 2 * math.pi, CIRCLE_SEGMENTS + 1)
+        self.circle = np.stack([np.cos(angles), np.sin(angles)], axis=1).astype(np.float32)
+
+    def add_rect(self, x, y, w, h, color):
+        span = self.quads.reserve(4)
+        self.quads.vertices[span] = ((x, y), (x + w, y), (x + w, y + h), (x, y + h))
+        self.quads.colors[span] = rgba(color)
+
+    def add_rects(self, xs, ys, w, h, color):
+        # Many same-sized rects at once, e.g. every bullet of one player. color
+        # is one color for all of them or an (n, 4) array with one per rect
+        n = len(xs)
+        if n == 0:
+            return
+        quads = np.empty((n, 4, 2), dtype=np.float32)
+        quads[:, 0, 0] = quads[:, 3, 0] = xs
+        quads[:, 1, 0] = quads[:, 2, 0] = xs + w
+        quads[:, 0, 1] = quads[:, 1, 1] = ys
+        quads[:, 2, 1] = quads[:, 3, 1] = ys + h
+        span = self.quads.reserve(n * 4)
+        self.quads.vertices[span] = quads.reshape(-1, 2)
+        if isinstance(color, np.ndarray):
+            self.quads.colors[span] = np.repeat(color, 4, axis=0)
+        else:
+            self.quads.colors[span] = rgba(color)
+
+    def add_circle(self, cx, cy, radius, color):
+        # A fan around the center, written out as separate triangles so
+        # every circle can share the one GL_TRIANGLES draw
+        rim = self.circle * radius + (cx, cy)
+        fan = np.empty((CIRCLE_SEGMENTS, 3, 2), dtype=np.float32)
+        fan[:, 0] = (cx, cy)
+        fan[:, 1] = rim[:-1]
+        fan[:, 2] = rim[1:]
+        span = self.triangles.reserve(CIRCLE_SEGMENTS * 3)
+        self.triangles.vertices[span] = fan.reshape(-1, 2)
+        self.triangles.colors[span] = rgba(color)
+
+    def flush(self):
+        # Returns the number of draw calls issued for the frame
+        glDisable(GL_TEXTURE_2D)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        self.draw_calls = self.quads.flush() + self.triangles.flush()
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glEnable(GL_TEXTURE_2D)
+        glColor3f(1.0, 1.0, 1.0)
+        return self.draw_calls
@@ -0,0 +1,33 @@
+from collections import OrderedDict
+import pygame
+
+# Rendered strings kept around; the HUD only ever needs a handful
+TEXT_CACHE_SIZE = 128
+
+class TextCache:
+    # Fonts are opened once and rendered text surfaces are reused until they
+    # become the least recently used entry
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+
+    def font(self, name, size):
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.SysFont(name, size)
+            self.fonts[key] = font
+        return font
+
+    def render(self, text, size, color, name=None):
+        key = (name, size, text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.font(name, size).render(text, True, color)
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.max_size:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
@@ -0,0 +1,217 @@
+import numpy as np
+from Player import *
+from SpatialGrid import *
+from BulletPool import *
+
+class ArenaBullets(BulletPool):
+    # One pool for the bullets of every arena, each tagged with its arena
+    fields = BulletPool.fields + ("arena",)
+
+    def __init__(self, capacity=BULLET_CAPACITY):
+        BulletPool.__init__(self, capacity)
+        self.arena = np.zeros(capacity, dtype=np.intp)
+
+    def spawn_many(self, x, y, dx, dy, owner, arena):
+        while self.count + len(x) > len(self.x):
+            self.grow()
+        span = slice(self.count, self.count + len(x))
+        self.x[span] = x
+        self.y[span] = y
+        self.dx[span] = dx
+        self.dy[span] = dy
+        self.owner[span] = owner
+        self.arena[span] = arena
+        self.alive[span] = True
+        self.count += len(x)
+
+    def remove(self, dead):
+        # dead is a mask over the live bullets
+        self.alive[:self.count] = ~dead
+        self.compact()
+
+def round_half_away(values):
+    # How pygame.Rect rounds a float coordinate when it is assigned
+    return np.where(values >= 0, np.floor(values + 0.5), np.ceil(values - 0.5)).astype(np.int64)
+
+class VecArena:
+    # n independent two-player matches on the same level, with every player and
+    # bullet field held in NumPy arrays of shape (n, 2) or (bullets,), so one
+    # step() advances all of them. Given the same inputs, each arena follows
+    # exactly the same rules as a World: Player.move, Player.shoot,
+    # Combat.update and the explosion and game over checks, in that order.
+    # Tunables are fixed per VecArena, with TUNABLES as the defaults.
+    def __init__(self, n, obstacles, width=WIDTH, height=HEIGHT, autoreset=True, spawns=None, grid=None, **params):
+        unknown = set(params) - set(TUNABLES)
+        if unknown:
+            raise ValueError(f"unknown tunables: {', '.join(sorted(unknown))}")
+        self.params = dict(TUNABLES, **params)
+        self.n = n
+        self.width = width
+        self.height = height
+        self.autoreset = autoreset
+        self.spawns = np.array(spawns or [(100, height // 2 - player_size // 2),
+                                          (width - 100 - player_size, height // 2 - player_size // 2)])[:2]
+        self.grid = grid if grid is not None else SpatialGrid([obs.rect for obs in obstacles])
+        self.bullets = ArenaBullets()
+
+        self.x = np.zeros((n, 2), dtype=np.int64)
+        self.y = np.zeros((n, 2), dtype=np.int64)
+        self.vertical_velocity = np.zeros((n, 2))
+        self.health = np.zeros((n, 2), dtype=np.int64)
+        self.on_ground = np.zeros((n, 2), dtype=bool)
+        self.exploding = np.zeros((n, 2), dtype=bool)
+        self.explosion_frame = np.zeros((n, 2), dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        # -1 while a match is undecided
+        self.winner = np.full(n, -1, dtype=np.int64)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.reset()
+
+    def reset(self, arenas=None):
+        # Restarts the given arenas (a mask or index array), or all of them
+        if arenas is None:
+            arenas = np.ones(self.n, dtype=bool)
+        self.x[arenas] = self.spawns[:, 0]
+        self.y[arenas] = self.spawns[:, 1]
+        self.vertical_velocity[arenas] = 0
+        self.health[arenas] = self.params["player_health"]
+        self.on_ground[arenas] = False
+        self.exploding[arenas] = False
+        self.explosion_frame[arenas] = 0
+        self.game_over[arenas] = False
+        self.winner[arenas] = -1
+        self.tick[arenas] = 0
+        cleared = np.zeros(self.n, dtype=bool)
+        cleared[arenas] = True
+        self.bullets.remove(cleared[self.bullets.arena[:self.bullets.count]])
+
+    def step(self, inputs):
+        # inputs is an (n, 2) array of INPUT_* bitmasks. Returns each arena's
+        # winner for matches that ended this tick and -1 everywhere else;
+        # with autoreset those arenas have already started over
+        inputs = np.asarray(inputs)
+        # Exploding players neither move nor shoot, and finished arenas stand still
+        acting = ~self.exploding & ~self.game_over[:, None]
+        self.shoot(acting & (inputs & INPUT_SHOOT != 0))
+        self.move(inputs, acting)
+        self.update_bullets()
+
+        # update_explosion, then the explosion trigger and game over checks.
+        # Explosions play once and players stay exploded after them
+        frame = self.explosion_frame
+        advancing = self.exploding & (frame < explosion_duration)
+        frame[advancing] += 1
+        dead = self.health <= 0
+        trigger = dead & ~self.exploding
+        self.exploding |= trigger
+        frame[trigger] = 0
+
+        over = dead & (frame >= explosion_duration)
+        finished = np.full(self.n, -1, dtype=np.int64)
+        # Player 2 is checked last, so it decides a simultaneous finish like in
+        # World, and the winner is settled on the tick the match ends
+        for player, winner in ((0, 1), (1, 0)):
+            ended = over[:, player] & ~self.game_over
+            self.winner[ended] = winner
+            finished[ended] = winner
+        self.game_over |= over.any(axis=1)
+        self.tick += 1
+        if self.autoreset and (finished >= 0).any():
+            self.reset(finished >= 0)
+        return finished
+
+    def shoot(self, shooting):
+        # Player.shoot for every player with its fire bit set, aimed at the other one's center
+        arena, player = np.nonzero(shooting)
+        if len(arena) == 0:
+            return
+        half = player_size // 2
+        cx, cy = self.x[arena, player] + half, self.y[arena, player] + half
+        dir_x = self.x[arena, 1 - player] + half - cx
+        dir_y = self.y[arena, 1 - player] + half - cy
+        distance = np.sqrt(dir_x ** 2 + dir_y ** 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dir_x = np.where(distance == 0, 0, dir_x / distance)
+            dir_y = np.where(distance == 0, 0, dir_y / distance)
+        speed = self.params["bullet_speed"]
+        self.bullets.spawn_many(cx, cy, dir_x * speed, dir_y * speed, player, arena)
+
+    def move(self, inputs, acting):
+        # Player.move for all players at once; the grid is queried only for the
+        # players that actually moved into something
+        params = self.params
+        speed = params["player_speed"]
+        grid = self.grid
+        x, y = self.x, self.y
+
+        for bit, step, outside in ((INPUT_LEFT, -speed, lambda nx: nx < 0),
+                                   (INPUT_RIGHT, speed, lambda nx: nx + player_size > self.width)):
+            moving = acting & (inputs & bit != 0)
+            arena, player = np.nonzero(moving)
+            nx = x[arena, player] + step
+            blocked = outside(nx) | grid.overlaps(nx, y[arena, player], player_size, player_size)
+            x[arena[~blocked], player[~blocked]] = nx[~blocked]
+
+        velocity = self.vertical_velocity
+        velocity[acting] = np.minimum(velocity[acting] + params["gravity"], params["max_fall_speed"])
+        y[acting] = round_half_away(y[acting] + velocity[acting])
+
+        self.on_ground[acting] = False
+        floor = acting & (y + player_size > self.height)
+        y[floor] = self.height - player_size
+        velocity[floor] = 0
+        self.on_ground[floor] = True
+
+        arena, player = np.nonzero(acting & ~floor)
+        hit = grid.first_overlap(x[arena, player], y[arena, player], player_size, player_size)
+        arena, player, hit = arena[hit >= 0], player[hit >= 0], hit[hit >= 0]
+        v = velocity[arena, player]
+        falling, rising = v > 0, v < 0
+        y[arena[falling], player[falling]] = grid.top[hit[falling]] - player_size
+        self.on_ground[arena[falling], player[falling]] = True
+        y[arena[rising], player[rising]] = grid.bottom[hit[rising]]
+        velocity[arena, player] = np.where(falling | rising, 0, v)
+
+        jumping = acting & (inputs & INPUT_UP != 0) & self.on_ground
+        velocity[jumping] = params["jump_speed"]
+
+    def update_bullets(self):
+        # Combat.update across every arena still being played
+        pool = self.bullets
+        n = pool.count
+        if n == 0:
+            return
+        arena = pool.arena[:n]
+        active = ~self.game_over[arena]
+        x, y = pool.x[:n], pool.y[:n]
+        dx, dy = pool.dx[:n], pool.dy[:n]
+
+        target = 1 - pool.owner[:n]
+        px = self.x[arena, target]
+        py = self.y[arena, target]
+        t_player = sweep_times(x, y, dx, dy, bullet_width, bullet_height,
+                               px, py, px + player_size, py + player_size)
+        t_obstacle = self.grid.sweep(x, y, dx, dy, bullet_width, bullet_height)
+        hit_player = active & np.isfinite(t_player) & (t_player <= t_obstacle)
+        hit_obstacle = active & np.isfinite(t_obstacle) & ~hit_player
+
+        x += np.where(active, dx, 0)
+        y += np.where(active, dy, 0)
+        out_of_bounds = active & ((x > self.width) | (x < 0) | (y > self.height) | (y < 0))
+
+        if hit_player.any():
+            hits = np.bincount(arena[hit_player] * 2 + target[hit_player], minlength=self.n * 2)
+            self.health -= hits.reshape(self.n, 2)
+
+        pool.remove(hit_player | hit_obstacle | out_of_bounds)
+
+    def observe(self):
+        # (n, 2, 5) float32 view of each player's state, scaled to roughly [-1, 1]:
+        # x, y, vertical velocity, health and on_ground
+        obs = np.empty((self.n, 2, 5), dtype=np.float32)
+        obs[..., 0] = self.x / self.width
+        obs[..., 1] = self.y / self.height
+        obs[..., 2] = self.vertical_velocity / self.params["max_fall_speed"]
+        obs[..., 3] = self.health / self.params["player_health"]
+        obs[..., 4] = self.on_ground
+        return obs
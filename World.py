@@ -0,0 +1,197 @@
+import struct
+import zlib
+import numpy as np
+import pygame
+from Player import *
+from SpatialGrid import *
+from BulletPool import *
+from Combat import *
+from Effects import *
+from Profiler import *
+
+# The simulation always advances in fixed ticks, however fast frames are drawn
+TICK_RATE = 60
+TICK_DT = 1.0 / TICK_RATE
+
+# save_state layout: tick, game over, winner team (-1 for none), bullet count, then
+# each player, then the bullets' x, y, dx and dy as float64 arrays and owners as bytes
+STATE_HEADER = struct.Struct("<i?hI")
+PLAYER_STATE = struct.Struct("<iidi??i")
+PLAYER_FIELDS = len(PLAYER_STATE.unpack(bytes(PLAYER_STATE.size)))
+# Bytes of state per bullet: four float64 fields and the owner byte
+BULLET_STATE_SIZE = 4 * 8 + 1
+
+def level_world(level, profiler=None, teams=None):
+    # A World set up from a Levels.Level
+    return World(level.obstacles, level.width, level.height, profiler, level.spawns, level.grid, teams)
+
+def make_teams(players, teams):
+    # Team of each player, dealt out in turn: players=4, teams=2 gives [0, 1, 0, 1].
+    # As many teams as players is a free-for-all
+    return [i % teams for i in range(players)]
+
+def spawn_points(spawns, count, width, height):
+    # The given spawns first, then any more players spread evenly across the
+    # middle. Spawns past the player count go unused
+    extra = max(count - len(spawns), 0)
+    if not extra:
+        return list(spawns[:count])
+    step = (width - player_size) / (extra + 1)
+    return list(spawns) + [(int(step * (i + 1)), height // 2 - player_size // 2) for i in range(extra)]
+
+class World:
+    # teams holds one team id per player and sets how many players there are;
+    # the default is the classic one-on-one
+    def __init__(self, obstacles, width=WIDTH, height=HEIGHT, profiler=None, spawns=None, grid=None, teams=None):
+        self.profiler = profiler or NULL_PROFILER
+        self.width = width
+        self.height = height
+        self.obstacles = obstacles
+        self.teams = list(teams or (0, 1))
+        self.spawns = spawn_points(spawns or [(100, height // 2 - player_size // 2),
+                                              (width - 100 - player_size, height // 2 - player_size // 2)],
+                                   len(self.teams), width, height)
+        # A compiled level brings its grid along
+        self.grid = grid if grid is not None else SpatialGrid([obs.rect for obs in obstacles])
+        self.combat = Combat(self.teams)
+        self.bullets = BulletPool()
+        self.explosions = ExplosionPool()
+        # Set a ParticleSystem to get effects; they never change the simulation
+        self.particles = NULL_PARTICLES
+        # Every player's fields in one struct, packed and unpacked in one call
+        self.players_state = struct.Struct("<" + PLAYER_STATE.format[1:] * len(self.teams))
+        self.players = [Player(x, y, TEAM_COLORS[team % len(TEAM_COLORS)])
+                        for (x, y), team in zip(self.spawns, self.teams)]
+        # Index of the player each one aims at, refreshed every tick
+        self.targets = self.combat.targets(self.players)
+        self.bullets.clear()
+        self.explosions.clear()
+        self.game_over = False
+        self.winner = None
+        self.tick = 0
+        self.start_state = self.save_state()
+
+    def reset(self):
+        # Back to the start of a match by restoring its first state, so the
+        # Player objects are reused rather than built again
+        self.load_state(self.start_state)
+
+    def step(self, inputs):
+        # inputs holds one INPUT_* bitmask per player for this tick
+        players = self.players
+        profiler = self.profiler
+        tests = self.grid.tests + self.combat.tests
+        if not self.game_over:
+            with profiler.scope("move"):
+                # Shots are taken before anyone moves, the same as the KEYDOWN
+                # events used to be, each at the nearest enemy
+                self.targets = targets = self.combat.targets(players)
+                for i, player in enumerate(players):
+                    if inputs[i] & INPUT_SHOOT and targets[i] != i:
+                        player.shoot(players[targets[i]].rect.center, self.bullets, i)
+
+                for i, player in enumerate(players):
+                    player.move(inputs[i], self.grid, self.width, self.height)
+
+            # Handle bullets and check for collisions
+            with profiler.scope("bullets"):
+                self.combat.update(self.bullets, players, self.grid, self.width, self.height)
+                if self.bullets.impacts is not None:
+                    self.particles.impacts(*self.bullets.impacts)
+
+        for player in self.players:
+            player.update_explosion()
+        self.explosions.update(self.particles)
+
+        # Check for game over and trigger explosion
+        for player in self.players:
+            if player.health <= 0 and not player.exploding:
+                player.exploding = True
+                player.explosion_frame = 0
+                self.explosions.acquire(*player.rect.center)
+                self.particles.burst(*player.rect.center, EXPLOSION_BURST)
+
+        # The match is over once at most one team has anyone left in it. That
+        # team wins; if the last ones all go out on the same tick, the lowest
+        # team id does, as player 1 always did in one-on-one
+        if not self.game_over:
+            standing = self.combat.standing(players)
+            if len(standing) <= 1:
+                self.winner = standing[0] if standing else min(self.teams)
+                self.game_over = True
+
+        self.particles.update(self.width, self.height)
+
+        self.tick += 1
+        profiler.count("ticks")
+        # Obstacle tests from the grid plus bullet-vs-player tests from combat
+        profiler.count("collision tests", self.grid.tests + self.combat.tests - tests)
+        profiler.gauge("bullets", len(self.bullets))
+        profiler.gauge("particles", len(self.particles))
+
+    def state_size(self):
+        # Bytes save_state() needs for the world as it is now
+        return STATE_HEADER.size + self.players_state.size + self.bullets.count * BULLET_STATE_SIZE
+
+    def save_state(self, out=None):
+        # Everything step() reads or writes, packed so that load_state() on a
+        # World with the same level continues exactly where this one was.
+        # Returns the state as bytes, or with out, a writable buffer of at
+        # least state_size() bytes, packs it there and returns its length
+        if out is None:
+            out = bytearray(self.state_size())
+            return bytes(out[:self.save_state(out)])
+        n = self.bullets.count
+        winner = -1 if self.winner is None else self.winner
+        STATE_HEADER.pack_into(out, 0, self.tick, self.game_over, winner, n)
+        fields = []
+        for player in self.players:
+            fields += (player.rect.x, player.rect.y, player.vertical_velocity, player.health,
+                       player.on_ground, player.exploding, player.explosion_frame)
+        self.players_state.pack_into(out, STATE_HEADER.size, *fields)
+        offset = STATE_HEADER.size + self.players_state.size
+        view = np.frombuffer(out, np.uint8)
+        pool = self.bullets
+        for array in (pool.x, pool.y, pool.dx, pool.dy):
+            view[offset:offset + n * 8] = array[:n].view(np.uint8)
+            offset += n * 8
+        view[offset:offset + n] = pool.owner[:n]
+        return offset + n
+
+    def load_state(self, data):
+        # data is anything save_state() produced: bytes, or a buffer it packed
+        self.tick, self.game_over, winner, n = STATE_HEADER.unpack_from(data)
+        self.winner = None if winner < 0 else winner
+        fields = self.players_state.unpack_from(data, STATE_HEADER.size)
+        for i, player in enumerate(self.players):
+            (player.rect.x, player.rect.y, player.vertical_velocity, player.health, player.on_ground,
+             player.exploding, player.explosion_frame) = fields[i * PLAYER_FIELDS:(i + 1) * PLAYER_FIELDS]
+        offset = STATE_HEADER.size + self.players_state.size
+        pool = self.bullets
+        pool.clear()
+        while len(pool.x) < n:
+            pool.grow()
+        for array in (pool.x, pool.y, pool.dx, pool.dy):
+            array[:n] = np.frombuffer(data, np.float64, n, offset)
+            offset += n * 8
+        pool.owner[:n] = np.frombuffer(data, np.uint8, n, offset)
+        pool.alive[:n] = True
+        pool.count = n
+        # Explosions aren't saved; they follow from the players
+        self.explosions.clear()
+        for player in self.players:
+            if player.exploding and player.explosion_frame < explosion_duration:
+                self.explosions.acquire(*player.rect.center, player.explosion_frame)
+        self.targets = self.combat.targets(self.players)
+
+    def checksum(self):
+        # CRC of the whole simulation state, for checking that two runs agree tick by tick
+        crc = zlib.crc32(struct.pack("<i?", self.tick, self.game_over))
+        for player in self.players:
+            crc = zlib.crc32(struct.pack("<iidi??i", player.rect.x, player.rect.y, player.vertical_velocity,
+                                         player.health, player.on_ground, player.exploding,
+                                         player.explosion_frame), crc)
+        n = self.bullets.count
+        for array in (self.bullets.x, self.bullets.y, self.bullets.dx, self.bullets.dy, self.bullets.owner):
+            crc = zlib.crc32(array[:n].tobytes(), crc)
+        return crc
@@ -0,0 +1,115 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Levels import *
+from Player import *
+from World import *
+from Bots import BOTS
+
+# A match nobody wins within this many ticks (about ten minutes) counts as a draw
+MAX_MATCH_TICKS = 36000
+
+def parse_param(text):
+    # "bullet_speed=5,7,9" -> ("bullet_speed", [5, 7, 9])
+    name, _, values = text.partition("=")
+    if name not in TUNABLES or not values:
+        raise argparse.ArgumentTypeError(f"expected NAME=V1,V2,... with NAME one of {', '.join(TUNABLES)}")
+    kind = type(TUNABLES[name])
+    return name, [kind(value) for value in values.split(",")]
+
+def param_sets(params):
+    # Every combination of the swept values
+    names = [name for name, _ in params]
+    for values in itertools.product(*(values for _, values in params)):
+        yield dict(zip(names, values))
+
+def play_match(job):
+    # Runs in a worker process: one full match from reset until game over
+    index, params, seed, level, bot, max_ticks = job
+    configure(**params)
+    world = level_world(load_level(level))
+    bots = [BOTS[bot](random.Random(seed * 2 + i)) for i in range(len(world.players))]
+    start = time.perf_counter()
+    while not world.game_over and world.tick < max_ticks:
+        world.step([bot(world, i) for i, bot in enumerate(bots)])
+    return index, world.winner, world.tick, time.perf_counter() - start
+
+def summarize(params, matches):
+    # matches is a list of (winner, ticks, seconds)
+    count = len(matches)
+    wins = [sum(1 for winner, _, _ in matches if winner == player) for player in (0, 1)]
+    lengths = sorted(ticks for _, ticks, _ in matches)
+    ticks = sum(lengths)
+    us_per_tick = [seconds / max(length, 1) * 1e6 for _, length, seconds in matches]
+    return dict(params,
+                matches=count,
+                p1_win=wins[0] / count,
+                p2_win=wins[1] / count,
+                draw=(count - wins[0] - wins[1]) / count,
+                mean_ticks=ticks / count,
+                median_ticks=lengths[count // 2],
+                us_per_tick=sum(seconds for _, _, seconds in matches) / max(ticks, 1) * 1e6,
+                worst_us_per_tick=max(us_per_tick))
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many headless matches in parallel and tabulate the outcomes")
+    parser.add_argument("--param", type=parse_param, action="append", default=[], metavar="NAME=V1,V2",
+                        help=f"tunable to sweep, repeatable; one of {', '.join(TUNABLES)}")
+    parser.add_argument("--matches", type=int, default=100, help="matches per parameter set")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first match; each match gets its own")
+    parser.add_argument("--level", choices=sorted(LEVELS), default="arena")
+    parser.add_argument("--bot", choices=sorted(BOTS), default="chase")
+    parser.add_argument("--max-ticks", type=int, default=MAX_MATCH_TICKS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes, all cores by default")
+    parser.add_argument("--out", metavar="PATH", help="also write the table to a .csv or .json file")
+    args = parser.parse_args()
+
+    sets = list(param_sets(args.param))
+    jobs = [(index, params, args.seed + n, args.level, args.bot, args.max_ticks)
+            for index, params in enumerate(sets) for n in range(args.matches)]
+    results = [[] for _ in sets]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as pool:
+        # Matches are short, so hand them out in chunks to keep the pipes quiet
+        chunksize = max(1, len(jobs) // (args.workers * 8))
+        for index, winner, ticks, seconds in pool.map(play_match, jobs, chunksize=chunksize):
+            results[index].append((winner, ticks, seconds))
+    elapsed = time.perf_counter() - start
+
+    rows = [summarize(params, matches) for params, matches in zip(sets, results)]
+    names = [name for name, _ in args.param]
+    header = "".join(f"{name:>15}" for name in names)
+    print(f"{header}{'matches':>8} {'P1 win':>7} {'P2 win':>7} {'draw':>6} {'mean ticks':>11} "
+          f"{'median':>7} {'us/tick':>8} {'worst':>7}")
+    for row in rows:
+        values = "".join(f"{row[name]:>15}" for name in names)
+        print(f"{values}{row['matches']:>8} {row['p1_win']:>7.1%} {row['p2_win']:>7.1%} {row['draw']:>6.1%} "
+              f"{row['mean_ticks']:>11.0f} {row['median_ticks']:>7} {row['us_per_tick']:>8.1f} "
+              f"{row['worst_us_per_tick']:>7.1f}")
+    total_ticks = sum(ticks for matches in results for _, ticks, _ in matches)
+    print(f"{len(jobs)} matches, {total_ticks} ticks in {elapsed:.1f}s on {args.workers} workers "
+          f"({total_ticks / elapsed:.0f} ticks/s)")
+
+    if args.out:
+        # CSV or JSON, picked by the file extension
+        if args.out.endswith(".json"):
+            with open(args.out, "w") as f:
+                json.dump(rows, f, indent=1)
+        else:
+            with open(args.out, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from Levels import *
+from World import *
+from Assets import *
+from Capture import *
+
+class ShotRenderer(CaptureRenderer):
+    # Presents nothing; the caller saves the frame itself
+    def present(self, full, rects):
+        pass
+
+def run(level, background, frames, seed, out, format=None, policy=None):
+    # Frames per second of a headless match drawn offscreen every tick and
+    # captured through a FrameWriter, or with no format, saved with
+    # pygame.image.save inside the loop the way a screenshot would be.
+    # Returns (frames/s, frames written, frames dropped)
+    rng = random.Random(seed)
+    world = level_world(level)
+    camera = Camera(*level.view, *level.size)
+    writer = None
+    if format:
+        path = os.path.join(out, f"{format}-{policy}" + (".raw" if format == "raw" else ""))
+        writer = FrameWriter(path, level.view, format, policy)
+        renderer = CaptureRenderer(writer, background, level.obstacles, camera)
+    else:
+        renderer = ShotRenderer(None, background, level.obstacles, camera)
+    start = time.perf_counter()
+    for frame in range(frames):
+        world.step([rng.getrandbits(5) for _ in world.players])
+        if world.game_over:
+            world.reset()
+        renderer.draw(world, [])
+        if not writer:
+            pygame.image.save(renderer.win, os.path.join(out, f"screenshot{frame:06d}.png"))
+    if not writer:
+        return frames / (time.perf_counter() - start), frames, 0
+    writer.close()
+    return frames / (time.perf_counter() - start), writer.written, writer.dropped
+
+def main():
+    parser = argparse.ArgumentParser(description="Offscreen frame capture throughput against in-loop screenshots")
+    parser.add_argument("--level", choices=sorted(LEVELS), default="arena")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    level = load_level(args.level)
+    background = decode_image(level.background_path, level.view)
+    out = tempfile.mkdtemp(prefix="capture-")
+    try:
+        print(f"{args.level}: {level.view[0]}x{level.view[1]}, {args.frames} frames, "
+              f"{CAPTURE_THREADS} PNG writer threads, real time is {TICK_RATE} fps")
+        print(f"{'mode':>22} {'fps':>7} {'written':>8} {'dropped':>8}")
+        for name, format, policy in (("screenshot in loop", None, None),
+                                     ("png, block", "png", "block"), ("png, drop", "png", "drop"),
+                                     ("raw, block", "raw", "block")):
+            fps, written, dropped = run(level, background, args.frames, args.seed, out, format, policy)
+            print(f"{name:>22} {fps:>7.0f} {written:>8} {dropped:>8}")
+    finally:
+        shutil.rmtree(out)
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import argparse
+import os
+import random
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from Levels import *
+from World import *
+from Bots import *
+from Profiler import *
+from sim import BENCH_HEALTH, top_up_bullets
+
+# Past any bullet-player count, so every bullet is box-tested against every player
+ALL_PAIRS = 1 << 62
+# Below any bullet-player count, so bullets always meet players through the grid
+GRID_ONLY = -1
+# Players and bullets in the check that both paths hit the same players:
+# 64 x 1000 pairs is past COMBAT_DENSE_LIMIT, where the grid path takes over
+CHECK_PLAYERS = 64
+CHECK_BULLETS = 1000
+
+def run(level, players, ticks, seed, dense_limit, fire_interval):
+    # A free-for-all of chase bots that can't die, so the player count holds
+    # for the whole run. Returns ticks/s, mean bullets phase µs (players and
+    # platforms), mean bullet count, box tests per tick and the final checksum
+    world = level_world(level, Profiler(), make_teams(players, players))
+    world.combat.dense_limit = dense_limit
+    for player in world.players:
+        player.health = BENCH_HEALTH
+    bots = [ChaseBot(random.Random(seed + i), fire_interval) for i in range(players)]
+    profiler = world.profiler
+    phase = bullets = 0.0
+    tests = world.combat.tests
+    start = time.perf_counter()
+    for _ in range(ticks):
+        inputs = [bot(world, i) for i, bot in enumerate(bots)]
+        profiler.begin_frame()
+        world.step(inputs)
+        phase += profiler.times.get("bullets", 0.0)
+        bullets += len(world.bullets)
+    elapsed = time.perf_counter() - start
+    return (ticks / elapsed, phase / ticks * 1e6, bullets / ticks,
+            (world.combat.tests - tests) / ticks, world.checksum())
+
+def check_spawns():
+    # Levels may bring more spawns than there are players, or fewer. Returns
+    # the (spawns, players) cases where World doesn't put each player on
+    # its own spawn, or those first and the rest spread out
+    spawns = [(100, 300), (400, 300), (700, 300)]
+    failed = []
+    for count in (2, 3, 5):
+        world = World([], spawns=spawns, teams=make_teams(count, count))
+        places = [player.rect.topleft for player in world.players]
+        if len(places) != count or places[:3] != spawns[:count] or len(set(places)) != count:
+            failed.append((len(spawns), count))
+    return failed
+
+def check_paths(level, players, bullets, ticks, seed):
+    # Resolves the same bullets against the same players with every pair
+    # box-tested and through the grid, tick after tick, and counts the ticks
+    # where the two disagree on who was hit, what was hit or where
+    rng = random.Random(seed)
+    world = level_world(level, teams=make_teams(players, players))
+    for player in world.players:
+        player.health = BENCH_HEALTH
+    # Everyone bunched into the middle third so plenty of bullets connect
+    for player in world.players:
+        player.rect.topleft = (rng.randrange(level.width // 3, 2 * level.width // 3), rng.randrange(level.height - 100))
+    combats = [Combat(world.teams, dense_limit=limit) for limit in (ALL_PAIRS, GRID_ONLY)]
+    mismatches = hits = 0
+    for _ in range(ticks):
+        top_up_bullets(world, rng, bullets)
+        pool = world.bullets
+        n = pool.count
+        saved = {name: getattr(pool, name)[:n].copy() for name in pool.fields}
+        results = []
+        for combat in combats:
+            for name, values in saved.items():
+                getattr(pool, name)[:n] = values
+            pool.count = n
+            health = [player.health for player in world.players]
+            combat.update(pool, world.players, world.grid, world.width, world.height)
+            damage = [before - player.health for before, player in zip(health, world.players)]
+            for player, before in zip(world.players, health):
+                player.health = before
+            impacts = pool.impacts and tuple(array.tolist() for array in pool.impacts)
+            results.append((damage, pool.count, pool.x[:pool.count].tolist(), pool.owner[:pool.count].tolist(), impacts))
+        mismatches += results[0] != results[1]
+        hits += sum(results[0][0])
+        for player in world.players:
+            player.move(rng.getrandbits(4), world.grid, world.width, world.height)
+    return mismatches, hits, combats[1].tests
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless tick cost against player count, free-for-all bots")
+    parser.add_argument("--level", choices=sorted(LEVELS), default="canyon")
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 4, 8, 16, 32, 64])
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fire-interval", type=int, default=20, help="ticks between each bot's shots")
+    parser.add_argument("--check-ticks", type=int, default=200,
+                        help="ticks of checking the grid path against all pairs past COMBAT_DENSE_LIMIT")
+    args = parser.parse_args()
+
+    failed = check_spawns()
+    print(f"3 spawns for 2, 3 and 5 players: {'ok' if not failed else f'WRONG for {failed}'}")
+    if failed:
+        sys.exit(1)
+
+    level = load_level(args.level)
+    mismatches, hits, tests = check_paths(level, CHECK_PLAYERS, CHECK_BULLETS, args.check_ticks, args.seed)
+    print(f"grid and all-pairs paths, {CHECK_PLAYERS} players x {CHECK_BULLETS} bullets over "
+          f"{args.check_ticks} ticks: {hits} hits, {tests} grid tests, "
+          f"{'identical' if not mismatches else f'DIFFERENT on {mismatches} ticks'}")
+
+    print(f"{args.level}: {level.width}x{level.height}, {args.ticks} ticks per run")
+    print(f"{'players':>7} {'bullets':>8} {'ticks/s':>8} {'bullets us':>10} {'tests':>7} "
+          f"{'all-pairs us':>13} {'tests':>7} {'grid us':>8} {'tests':>7}  same result")
+    same = not mismatches
+    for players in args.players:
+        rate, combat, bullets, tests, checksum = run(level, players, args.ticks, args.seed,
+                                                     COMBAT_DENSE_LIMIT, args.fire_interval)
+        _, brute, _, brute_tests, brute_checksum = run(level, players, args.ticks, args.seed,
+                                                       ALL_PAIRS, args.fire_interval)
+        _, grid, _, grid_tests, grid_checksum = run(level, players, args.ticks, args.seed,
+                                                    GRID_ONLY, args.fire_interval)
+        agree = checksum == brute_checksum == grid_checksum
+        same = same and agree
+        print(f"{players:>7} {bullets:>8.0f} {rate:>8.0f} {combat:>10.1f} {tests:>7.0f} "
+              f"{brute:>13.1f} {brute_tests:>7.0f} {grid:>8.1f} {grid_tests:>7.0f}  {'yes' if agree else 'NO'}")
+    if not same:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+# Runs without a desktop: SDL's offscreen driver gives an EGL context, which
+# Mesa serves with llvmpipe when there is no GPU
+os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+from OpenGL.GLU import *
+from SpriteBatch import *
+
+WIDTH, HEIGHT = 800, 600
+
+def make_scene(rng, bullets):
+    players = [(100, 275, (1.0, 0.0, 0.0)), (650, 275, (0.0, 0.0, 1.0))]
+    obstacles = [(100, 300, 200, 10), (600, 500, 200, 10), (300, 500, 200, 10)]
+    xs = np.array([rng.uniform(0, WIDTH) for _ in range(bullets)], dtype=np.float32)
+    ys = np.array([rng.uniform(0, HEIGHT) for _ in range(bullets)], dtype=np.float32)
+    return players, obstacles, xs, ys
+
+def draw_immediate(players, obstacles, xs, ys):
+    # What tempCodeRunnerFile.py used to do: one glBegin/glEnd per shape
+    calls = 0
+    for x, y, color in players:
+        glColor3f(*color)
+        glBegin(GL_QUADS)
+        glVertex2f(x, y)
+        glVertex2f(x + 50, y)
+        glVertex2f(x + 50, y + 50)
+        glVertex2f(x, y + 50)
+        glEnd()
+        calls += 1
+    half = len(xs) // 2
+    for i, (x, y) in enumerate(zip(xs.tolist(), ys.tolist())):
+        glColor3f(*players[i >= half][2])
+        glBegin(GL_QUADS)
+        glVertex2f(x, y)
+        glVertex2f(x + 10, y)
+        glVertex2f(x + 10, y + 5)
+        glVertex2f(x, y + 5)
+        glEnd()
+        calls += 1
+    for x, y, w, h in obstacles:
+        glColor3f(0.0, 0.0, 0.0)
+        glBegin(GL_QUADS)
+        glVertex2f(x, y)
+        glVertex2f(x + w, y)
+        glVertex2f(x + w, y + h)
+        glVertex2f(x, y + h)
+        glEnd()
+        calls += 1
+    return calls
+
+def draw_batched(batch, players, obstacles, xs, ys):
+    for x, y, color in players:
+        batch.add_rect(x, y, 50, 50, color)
+    half = len(xs) // 2
+    batch.add_rects(xs[:half], ys[:half], 10, 5, players[0][2])
+    batch.add_rects(xs[half:], ys[half:], 10, 5, players[1][2])
+    for x, y, w, h in obstacles:
+        batch.add_rect(x, y, w, h, (0.0, 0.0, 0.0))
+    return batch.flush()
+
+def time_frames(draw, frames):
+    # CPU time spent submitting a frame, with glFinish so queued work is counted
+    samples = []
+    for _ in range(frames):
+        glClear(GL_COLOR_BUFFER_BIT)
+        start = time.perf_counter()
+        calls = draw()
+        glFinish()
+        samples.append(time.perf_counter() - start)
+    return calls, float(np.median(samples))
+
+def read_frame():
+    return np.frombuffer(glReadPixels(0, 0, WIDTH, HEIGHT, GL_RGB, GL_UNSIGNED_BYTE), dtype=np.uint8)
+
+def main():
+    parser = argparse.ArgumentParser(description="Draw calls and CPU time per frame, immediate mode vs SpriteBatch")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bullets", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT), pygame.OPENGL | pygame.DOUBLEBUF)
+    glViewport(0, 0, WIDTH, HEIGHT)
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    gluOrtho2D(0, WIDTH, HEIGHT, 0)
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    glClearColor(1.0, 1.0, 1.0, 1.0)
+    print(f"renderer: {glGetString(GL_RENDERER).decode()}")
+
+    batch = SpriteBatch()
+    print(f"{'bullets':>8} {'immediate calls':>16} {'immediate ms':>13} {'batched calls':>14} {'batched ms':>11} {'same pixels':>12}")
+    for count in args.bullets:
+        scene = make_scene(random.Random(args.seed), count)
+        immediate_calls, immediate = time_frames(lambda: draw_immediate(*scene), args.frames)
+        immediate_pixels = read_frame()
+        batched_calls, batched = time_frames(lambda: draw_batched(batch, *scene), args.frames)
+        same = bool((read_frame() == immediate_pixels).all())
+        print(f"{count:>8} {immediate_calls:>16} {immediate * 1000:>13.3f} {batched_calls:>14} {batched * 1000:>11.3f} {str(same):>12}")
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
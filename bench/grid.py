@@ -0,0 +1,108 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pygame
+from Player import *
+from SpatialGrid import *
+
+# Platforms per 1000x750 screen in main.py; maps grow wider as platforms are added
+PLATFORMS_PER_SCREEN = 10
+SCREEN_WIDTH, SCREEN_HEIGHT = 1000, 750
+# Bullets per batch query, and how many of them are checked one by one
+# against every platform
+BATCH_BULLETS = 10000
+CHECK_BULLETS = 500
+
+def make_map(rng, platforms, screens=None):
+    # One screen per PLATFORMS_PER_SCREEN platforms unless screens is given
+    if screens is None:
+        screens = max(1, platforms // PLATFORMS_PER_SCREEN)
+    width = SCREEN_WIDTH * screens
+    return width, [pygame.Rect(rng.randrange(width), rng.randrange(SCREEN_HEIGHT), 200, 10) for _ in range(platforms)]
+
+def make_bullets(rng, width, bullets):
+    return [pygame.Rect(rng.randrange(width), rng.randrange(SCREEN_HEIGHT), 10, 5) for _ in range(bullets)]
+
+def time_ticks(query, bullets, ticks):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for bullet in bullets:
+            query(bullet)
+    return (time.perf_counter() - start) / ticks
+
+def make_batch(rng, width, count):
+    # Bullet positions and this tick's motion as arrays, in random directions
+    x = np.array([rng.uniform(0, width) for _ in range(count)])
+    y = np.array([rng.uniform(0, SCREEN_HEIGHT) for _ in range(count)])
+    angle = np.array([rng.uniform(0, 2 * np.pi) for _ in range(count)])
+    return x, y, np.cos(angle) * bullet_speed, np.sin(angle) * bullet_speed
+
+def time_batch(query, ticks):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        query()
+    return (time.perf_counter() - start) / ticks
+
+def check_sweep(grid, x, y, dx, dy):
+    # The grid's sweep against sweep_times over every platform, for the first
+    # CHECK_BULLETS bullets
+    x, y, dx, dy = x[:CHECK_BULLETS], y[:CHECK_BULLETS], dx[:CHECK_BULLETS], dy[:CHECK_BULLETS]
+    expected = sweep_times(x[:, None], y[:, None], dx[:, None], dy[:, None], bullet_width, bullet_height,
+                           grid.left[:-1], grid.top[:-1], grid.right[:-1], grid.bottom[:-1]).min(axis=1, initial=np.inf)
+    return np.array_equal(grid.sweep(x, y, dx, dy, bullet_width, bullet_height), expected)
+
+def batch(args):
+    # sweep and overlaps for BATCH_BULLETS at once, over platform counts and
+    # map widths; returns whether every sweep matched the brute-force check
+    print(f"\n{BATCH_BULLETS} bullets per batch query")
+    print(f"{'platforms':>10} {'screens':>8} {'sweep ms/tick':>14} {'overlaps ms/tick':>17} {'tests/bullet':>13} {'check':>6}")
+    ok = True
+    for screens in args.screens:
+        for platforms in args.platforms:
+            rng = random.Random(args.seed)
+            width, rects = make_map(rng, platforms, screens)
+            grid = SpatialGrid(rects)
+            x, y, dx, dy = make_batch(rng, width, BATCH_BULLETS)
+            same = check_sweep(grid, x, y, dx, dy)
+            ok &= same
+            grid.tests = 0
+            swept = time_batch(lambda: grid.sweep(x, y, dx, dy, bullet_width, bullet_height), args.ticks)
+            tests = grid.tests / args.ticks / BATCH_BULLETS
+            overlapped = time_batch(lambda: grid.overlaps(x, y, bullet_width, bullet_height), args.ticks)
+            print(f"{platforms:>10} {screens:>8} {swept * 1000:>14.3f} {overlapped * 1000:>17.3f} "
+                  f"{tests:>13.1f} {'ok' if same else 'DIFFERS':>6}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-tick bullet vs obstacle cost, linear scan vs spatial grid")
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--platforms", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--bullets", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--screens", type=int, nargs="+", default=[1, 10, 100],
+                        help=f"map widths for the batch queries, in {SCREEN_WIDTH}px screens")
+    args = parser.parse_args()
+
+    print(f"{'platforms':>10} {'bullets':>8} {'linear ms/tick':>15} {'grid ms/tick':>13} {'grid us/bullet':>15}")
+    for platforms in args.platforms:
+        rng = random.Random(args.seed)
+        width, rects = make_map(rng, platforms)
+        grid = SpatialGrid(rects)
+        for count in args.bullets:
+            bullets = make_bullets(rng, width, count)
+            # The linear scan gets slow fast, so give it fewer ticks on big maps
+            linear_ticks = max(1, args.ticks * 100 // max(platforms, 100))
+            linear = time_ticks(lambda rect: rect.collidelist(rects), bullets, linear_ticks)
+            indexed = time_ticks(grid.collide, bullets, args.ticks)
+            print(f"{platforms:>10} {count:>8} {linear * 1000:>15.3f} {indexed * 1000:>13.3f} {indexed / count * 1e6:>15.3f}")
+    if not batch(args):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
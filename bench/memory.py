@@ -0,0 +1,65 @@
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+from Player import *
+from Obstacle import *
+from BulletPool import *
+
+# The same classes without __slots__, i.e. how Player and Obstacle used to be laid out
+class DictPlayer:
+    __init__ = Player.__init__
+
+class DictObstacle:
+    __init__ = Obstacle.__init__
+
+def dict_bullets(n):
+    # The old bullet: a dict holding a Rect and a direction tuple, one per shot
+    return [{"rect": pygame.Rect(i % 1000, i % 750, bullet_width, bullet_height), "direction": (0.6, 0.8), "owner": i & 1}
+            for i in range(n)]
+
+def pool_bullets(n):
+    pool = BulletPool()
+    for i in range(n):
+        pool.spawn(i % 1000, i % 750, 0.6 * bullet_speed, 0.8 * bullet_speed, i & 1)
+    return pool
+
+def measure(build, n):
+    # Bytes per entity still allocated once `build` has made n of them
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entities = build(n)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del entities
+    return (after - before) / n
+
+CASES = [
+    ("player", lambda n: [DictPlayer(i % 1000, 100, RED) for i in range(n)],
+               lambda n: [Player(i % 1000, 100, RED) for i in range(n)]),
+    ("obstacle", lambda n: [DictObstacle(i % 1000, 100, 200, 10) for i in range(n)],
+                 lambda n: [Obstacle(i % 1000, 100, 200, 10) for i in range(n)]),
+    ("bullet", dict_bullets, pool_bullets),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per entity, dict-backed vs slotted and array-backed")
+    parser.add_argument("--entities", type=int, default=100000)
+    args = parser.parse_args()
+
+    n = args.entities
+    print(f"{n} entities each")
+    print(f"{'entity':>9} {'dict B/each':>12} {'now B/each':>11} {'dict MB':>8} {'now MB':>7} {'saved':>6}")
+    for name, old, new in CASES:
+        before, after = measure(old, n), measure(new, n)
+        print(f"{name:>9} {before:>12.0f} {after:>11.0f} {before * n / 2**20:>8.1f} {after * n / 2**20:>7.1f} "
+              f"{1 - after / before:>6.0%}")
+
+if __name__ == "__main__":
+    main()
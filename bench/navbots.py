@@ -0,0 +1,149 @@
+import argparse
+import os
+import random
+import sys
+import time
+import pygame
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from Levels import *
+from World import *
+from Bots import *
+from Navigation import *
+from sim import BENCH_HEALTH
+
+# A bot's think time per tick past this is flagged; 64 of them at this cost
+# still leave most of a 60 fps frame for everything else
+THINK_BUDGET_US = 50
+# Ticks a bot gets to reach its goal surface in the reach test
+REACH_TICKS = 1500
+# Level heights below NAV_MAX_DROP, which the graph has to build on too
+SHORT_HEIGHTS = (300, 400, 500)
+# A gravity light enough that a standing player's step rounds to no movement
+LIGHT_GRAVITY = 0.2
+
+def percentiles(times):
+    # Mean, p99 and max of a list of seconds, in µs
+    times = sorted(times)
+    return (sum(times) / len(times) * 1e6, times[int(len(times) * 0.99)] * 1e6, times[-1] * 1e6)
+
+def compile_time(level):
+    start = time.perf_counter()
+    graph = NavGraph(level.grid.rects, level.width, level.height, level.grid)
+    return (time.perf_counter() - start) * 1000, graph
+
+def short_levels():
+    # Builds a graph on levels shorter than NAV_MAX_DROP, two platforms and
+    # the floor each, and checks the floor can route onto the higher platform.
+    # Returns the heights where it can't
+    failed = []
+    for height in SHORT_HEIGHTS:
+        rects = [pygame.Rect(100, height - 60, 200, 10), pygame.Rect(350, height - 120, 200, 10)]
+        graph = NavGraph(rects, WIDTH, height)
+        if graph.route(graph.floor_nodes[0], graph.nodes_on[1][0]) is None:
+            failed.append(height)
+    return failed
+
+def light_gravity(level):
+    # Builds the graph under LIGHT_GRAVITY; the jump table has to rise and
+    # some surface has to be reached by jumping. Returns (rise, jump edges)
+    configure(gravity=LIGHT_GRAVITY)
+    try:
+        graph = NavGraph(level.grid.rects, level.width, level.height, level.grid)
+    finally:
+        configure()
+    jumps = sum(edge[1] == NAV_JUMP for edges in graph.edges for edge in edges)
+    return -int(graph.jump_drop.min()), jumps
+
+def reach(level, bot_name, trials, seed):
+    # A standing target is put on a random surface and one bot dropped at a
+    # random spot on the floor; counts the bots that get onto the target's
+    # surface within REACH_TICKS, and their mean ticks to do it
+    rng = random.Random(seed)
+    reached = ticks = 0
+    for trial in range(trials):
+        world = level_world(level)
+        nav = nav_graph(world)
+        for player in world.players:
+            player.health = BENCH_HEALTH
+        goal = rng.randrange(len(nav))
+        target, me = world.players
+        target.rect.x = (nav.lo[goal] + nav.hi[goal]) // 2
+        target.rect.bottom = nav.top[goal]
+        while True:
+            me.rect.topleft = (rng.randrange(level.width - player_size), level.height - player_size)
+            if world.grid.collide(me.rect) == -1:
+                break
+        # Never fires, so the target stays put
+        bot = BOTS[bot_name](random.Random(seed + trial), fire_interval=10 ** 9)
+        for tick in range(REACH_TICKS):
+            world.step([0, bot(world, 1)])
+            if me.on_ground and nav.node_at(me.rect) == goal:
+                reached += 1
+                ticks += tick
+                break
+    return reached, ticks / max(reached, 1)
+
+def crowd(level, players, ticks, seed):
+    # A free-for-all of NavBots that can't die; returns every single bot call's
+    # think time, and the graph's searches and surfaces expanded over the run
+    world = level_world(level, teams=make_teams(players, players))
+    nav = nav_graph(world)
+    for player in world.players:
+        player.health = BENCH_HEALTH
+    bots = [NavBot(random.Random(seed + i)) for i in range(players)]
+    searches, expanded = nav.searches, nav.expanded
+    think = []
+    clock = time.perf_counter
+    for _ in range(ticks):
+        inputs = []
+        for i, bot in enumerate(bots):
+            start = clock()
+            inputs.append(bot(world, i))
+            think.append(clock() - start)
+        world.step(inputs)
+    return think, nav.searches - searches, nav.expanded - expanded
+
+def main():
+    parser = argparse.ArgumentParser(description="NavBot think time, graph compile time and route quality")
+    parser.add_argument("--level", choices=sorted(LEVELS), default="canyon")
+    parser.add_argument("--players", type=int, default=64)
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--trials", type=int, default=60, help="reach test runs per bot and level")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    failed = short_levels()
+    print(f"short levels {', '.join(map(str, SHORT_HEIGHTS))} px tall: "
+          f"{'ok' if not failed else 'FAILED at ' + ', '.join(map(str, failed))}")
+    if failed:
+        sys.exit(1)
+    rise, jumps = light_gravity(load_level(args.level))
+    print(f"gravity {LIGHT_GRAVITY} on {args.level}: jumps rise {rise} px, {jumps} jump edges: "
+          f"{'ok' if rise > 0 and jumps else 'FAILED'}")
+    if not (rise > 0 and jumps):
+        sys.exit(1)
+
+    print(f"{'level':>8} {'surfaces':>8} {'edges':>6} {'compile ms':>10}")
+    for name in sorted(LEVELS):
+        ms, graph = compile_time(load_level(name))
+        print(f"{name:>8} {len(graph):>8} {sum(map(len, graph.edges)):>6} {ms:>10.1f}")
+
+    level = load_level(args.level)
+    print(f"\nreach test on {args.level}, {args.trials} runs of {REACH_TICKS} ticks")
+    for bot_name in ("chase", "nav"):
+        reached, mean = reach(level, bot_name, args.trials, args.seed)
+        print(f"{bot_name:>8}: reached {reached}/{args.trials}, mean {mean:.0f} ticks")
+
+    think, searches, expanded = crowd(level, args.players, args.ticks, args.seed)
+    mean, p99, worst = percentiles(think)
+    print(f"\n{args.players} NavBots on {args.level}, {args.ticks} ticks")
+    print(f"think us: mean {mean:.1f}, p99 {p99:.1f}, max {worst:.1f} (budget {THINK_BUDGET_US})")
+    print(f"searches {searches}, {expanded / max(searches, 1):.1f} surfaces expanded each")
+    over = sum(t * 1e6 > THINK_BUDGET_US for t in think)
+    print(f"over budget: {over} of {len(think)} calls -> {'ok' if p99 <= THINK_BUDGET_US else 'OVER BUDGET'}")
+
+if __name__ == "__main__":
+    main()
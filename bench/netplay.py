@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Levels import *
+from Net import *
+from Bots import BOTS
+
+async def drive(client, bot, seconds):
+    # A bot plays through the client at the client's own fixed tick rate
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    ticks = 0
+    while ticks < seconds * TICK_RATE:
+        client.tick(bot(client.world, client.slot))
+        ticks += 1
+        await asyncio.sleep(max(0.0, start + ticks * TICK_DT - loop.time()))
+
+async def session(args):
+    link = {"latency": args.latency / 1000 / 2, "jitter": args.jitter / 1000, "loss": args.loss}
+    server, port = await start_server(args.level, "127.0.0.1", 0, dict(link, seed=args.seed))
+    server_task = asyncio.ensure_future(server.run())
+    clients = [await connect("127.0.0.1", port, dict(link, seed=args.seed + 1 + i)) for i in range(2)]
+    bots = [BOTS[args.bot](random.Random(args.seed + i)) for i in range(2)]
+    await asyncio.gather(*(drive(client, bot, args.seconds) for client, bot in zip(clients, bots)))
+    # Let the last snapshots land before comparing
+    await asyncio.sleep(args.latency / 1000 + args.jitter / 1000 + 0.1)
+    server_task.cancel()
+
+    full_size = len(server.world.save_state())
+    ok = True
+    print(f"link: {args.latency} ms round trip, {args.jitter} ms jitter, {args.loss:.0%} loss, "
+          f"{args.seconds} s of {args.bot} bots on {args.level}")
+    print(f"server: {server.frame} ticks, {server.transport.sent} datagrams sent, {server.transport.dropped} dropped, "
+          f"{server.transport.bytes / max(server.transport.sent, 1):.0f} bytes each (full state {full_size} bytes)")
+    for client in clients:
+        received = max(client.received, 1)
+        # The newest decoded snapshot has to be exactly what the server sent for that frame
+        in_sync = client.snapshots.get(client.frame) == server.history.get(client.frame)
+        ok &= in_sync and client.bad_snapshots == 0
+        print(f"player {client.slot + 1}: {client.received} snapshots ({client.full_snapshots} full), "
+              f"{client.snapshot_bytes / received:.0f} bytes avg, {client.transport.dropped} of "
+              f"{client.transport.sent} inputs dropped; {client.corrections} corrections, "
+              f"mean {client.correction_total / max(client.corrections, 1):.1f} px, "
+              f"max {client.correction_max:.1f} px; bad {client.bad_snapshots}; "
+              f"{'in sync' if in_sync else 'OUT OF SYNC'} at frame {client.frame}")
+    for client in clients:
+        client.close()
+    server.transport.close()
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Server and two bot clients over loopback UDP with a simulated bad link")
+    parser.add_argument("--level", choices=sorted(LEVELS), default="arena")
+    parser.add_argument("--bot", choices=sorted(BOTS), default="chase")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=100, help="round trip time in ms")
+    parser.add_argument("--jitter", type=float, default=20, help="extra random delay per datagram in ms")
+    parser.add_argument("--loss", type=float, default=0.05, help="fraction of datagrams dropped, each way")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(session(args)) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import random
+import subprocess
+import sys
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Display setup each backend needs to run without a desktop
+BACKEND_ENV = {
+    "null": {"SDL_VIDEODRIVER": "dummy"},
+    "software": {"SDL_VIDEODRIVER": "dummy"},
+    "opengl": {"SDL_VIDEODRIVER": "offscreen", "PYOPENGL_PLATFORM": "egl"},
+}
+
+def run_backend(backend, level, ticks, seed):
+    # Steps the World and draws every tick, folding each tick's checksum into one trace
+    import pygame
+    from Assets import decode_image
+    from Levels import load_level
+    from Renderer import create_renderer
+    from TextCache import TextCache
+    from World import level_world
+    from main import hud_overlays
+
+    pygame.init()
+    level = load_level(level)
+    world = level_world(level)
+    background = decode_image(level.background_path, (level.width, level.height))
+    renderer = create_renderer(backend, level.width, level.height, background, level.obstacles)
+    text_cache = TextCache()
+    rng = random.Random(seed)
+    trace = 0
+    for _ in range(ticks):
+        world.step((rng.getrandbits(5), rng.getrandbits(5)))
+        renderer.draw(world, hud_overlays(world, text_cache, level.width))
+        trace = zlib.crc32(world.checksum().to_bytes(4, "little"), trace)
+        if world.game_over:
+            world.reset()
+    pygame.quit()
+    return trace
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that every renderer leaves the simulation in the same state")
+    parser.add_argument("--ticks", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--level", default="arena")
+    parser.add_argument("--backend", help="run one backend in this process and print its trace")
+    args = parser.parse_args()
+
+    if args.backend:
+        print(run_backend(args.backend, args.level, args.ticks, args.seed))
+        return
+
+    traces = {}
+    for backend, env in BACKEND_ENV.items():
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--backend", backend, "--ticks", str(args.ticks),
+             "--seed", str(args.seed), "--level", args.level],
+            env={**os.environ, **env}, capture_output=True, text=True)
+        if result.returncode != 0:
+            # A backend that can't start here (no PyOpenGL, no GL context) is skipped, not failed
+            print(f"{backend:>9}: skipped ({result.stderr.strip().splitlines()[-1]})")
+            continue
+        traces[backend] = int(result.stdout.strip().splitlines()[-1])
+        print(f"{backend:>9}: {traces[backend]:08x}")
+
+    if len(set(traces.values())) > 1:
+        print("MISMATCH: renderers disagree on the simulation state")
+        sys.exit(1)
+    print(f"ok: {len(traces)} backends agree over {args.ticks} ticks")
+
+if __name__ == "__main__":
+    main()
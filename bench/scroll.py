@@ -0,0 +1,58 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from Player import *
+from World import *
+from Assets import *
+from Renderer import *
+from sim import make_obstacles, top_up_bullets
+
+# Per window-sized screen of map, so every map looks the same through the camera
+OBSTACLES_PER_SCREEN = 10
+BULLETS_PER_SCREEN = 100
+
+def run(screens, frames, seed, background):
+    # Both players run right across a map `screens` windows wide, so the
+    # camera scrolls and the window is repainted every frame
+    rng = random.Random(seed)
+    width = WIDTH * screens
+    obstacles = make_obstacles(rng, OBSTACLES_PER_SCREEN * screens, width, HEIGHT)
+    spawns = [(100, HEIGHT - player_size), (300, HEIGHT - player_size)]
+    world = World(obstacles, width, HEIGHT, spawns=spawns)
+    world.particles = ParticleSystem()
+    renderer = create_renderer("software", WIDTH, HEIGHT, background, obstacles, (width, HEIGHT))
+    times = []
+    for frame in range(frames):
+        top_up_bullets(world, rng, BULLETS_PER_SCREEN * screens)
+        world.step((INPUT_RIGHT | INPUT_SHOOT * (frame % 10 == 0), INPUT_RIGHT))
+        start = time.perf_counter()
+        renderer.draw(world, [])
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return (sum(times) / frames * 1000, times[int(frames * 0.99)] * 1000,
+            len(renderer.layer.chunks), len(world.bullets), len(obstacles))
+
+def main():
+    parser = argparse.ArgumentParser(description="Software renderer frame cost against map size, with a scrolling camera")
+    parser.add_argument("--screens", type=int, nargs="+", default=[1, 4, 16, 64], help="map widths in windows")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pygame.display.init()
+    background = decode_image(os.path.join(ROOT, "ground.jpg"), (WIDTH, HEIGHT))
+    print(f"{'screens':>7} {'obstacles':>9} {'bullets':>8} {'draw ms':>8} {'p99 ms':>7} {'chunks':>7}")
+    for screens in args.screens:
+        mean, p99, chunks, bullets, obstacles = run(screens, args.frames, args.seed, background)
+        print(f"{screens:>7} {obstacles:>9} {bullets:>8} {mean:>8.2f} {p99:>7.2f} {chunks:>7}")
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
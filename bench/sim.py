@@ -0,0 +1,183 @@
+import argparse
+import datetime
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+from Obstacle import *
+from Player import *
+from World import *
+from Profiler import *
+from Bots import *
+from SpatialGrid import *
+
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+# Bench players soak up hits so a sweep measures the steady state, not resets
+BENCH_HEALTH = 10 ** 9
+# Slower than this against the baseline is flagged
+REGRESSION_THRESHOLD = 0.10
+# --dense: platform counts either side of the grid's linear cutoff and well
+# past it, all on the default map under a heavy bullet load
+DENSE_OBSTACLES = (LINEAR_LIMIT, LINEAR_LIMIT + 1, 40, 200, 1000)
+DENSE_BULLETS = 10000
+
+def make_obstacles(rng, count, width, height):
+    # Platforms the size of the built-in ones, scattered over the whole map
+    return [Obstacle(rng.randrange(width - 200), rng.randrange(100, height - 10), 200, 10) for _ in range(count)]
+
+def top_up_bullets(world, rng, target):
+    # Keeps `target` bullets in flight, aimed in random directions from random spots
+    pool = world.bullets
+    while len(pool) < target:
+        angle = rng.uniform(0, 2 * math.pi)
+        pool.spawn(rng.uniform(0, world.width), rng.uniform(0, world.height),
+                   math.cos(angle) * bullet_speed, math.sin(angle) * bullet_speed, rng.randrange(len(world.players)))
+
+def make_world(scenario, seed):
+    rng = random.Random(seed)
+    width, height = scenario["size"]
+    world = World(make_obstacles(rng, scenario["obstacles"], width, height), width, height, Profiler())
+    for player in world.players:
+        player.health = BENCH_HEALTH
+    bots = [BOTS[scenario["bot"]](random.Random(seed + i)) for i in range(len(world.players))]
+    return world, bots, rng
+
+def run_ticks(world, bots, rng, bullets, ticks, latencies=None, phases=None):
+    profiler = world.profiler
+    for _ in range(ticks):
+        top_up_bullets(world, rng, bullets)
+        inputs = [bot(world, i) for i, bot in enumerate(bots)]
+        profiler.begin_frame()
+        start = time.perf_counter_ns()
+        world.step(inputs)
+        if latencies is not None:
+            latencies.append(time.perf_counter_ns() - start)
+        if phases is not None:
+            # Per-phase totals, so a slowdown can be pinned on movement or bullets
+            for name, seconds in profiler.times.items():
+                phases[name] = phases.get(name, 0.0) + seconds
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run_scenario(scenario, ticks, memory_ticks, seed):
+    # Timed pass first; tracemalloc slows allocation down, so memory gets its own shorter pass
+    world, bots, rng = make_world(scenario, seed)
+    run_ticks(world, bots, rng, scenario["bullets"], min(ticks // 10, 100))
+    latencies = []
+    phases = {}
+    run_ticks(world, bots, rng, scenario["bullets"], ticks, latencies, phases)
+    latencies.sort()
+    total = sum(latencies) / 1e9
+
+    tracemalloc.start()
+    world, bots, rng = make_world(scenario, seed)
+    run_ticks(world, bots, rng, scenario["bullets"], memory_ticks)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return dict(scenario, size=list(scenario["size"]), ticks=ticks,
+                ticks_per_s=ticks / total,
+                p50_us=percentile(latencies, 0.50) / 1000,
+                p99_us=percentile(latencies, 0.99) / 1000,
+                move_us=phases.get("move", 0.0) / ticks * 1e6,
+                bullets_us=phases.get("bullets", 0.0) / ticks * 1e6,
+                peak_kb=peak / 1024)
+
+def scenario_key(result):
+    return (result["bot"], tuple(result["size"]), result["obstacles"], result["bullets"])
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless simulation benchmark with bot players")
+    parser.add_argument("--ticks", type=int, default=1000, help="timed ticks per scenario")
+    parser.add_argument("--memory-ticks", type=int, default=200, help="ticks traced for peak memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bots", choices=sorted(BOTS), nargs="+", default=["chase"])
+    parser.add_argument("--bullets", type=int, nargs="+", default=[0, 100, 1000])
+    parser.add_argument("--obstacles", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--sizes", type=parse_size, nargs="+", default=[(1000, 750), (4000, 3000)],
+                        metavar="WxH")
+    parser.add_argument("--dense", action="store_true",
+                        help=f"also run {', '.join(map(str, DENSE_OBSTACLES))} platforms at {WIDTH}x{HEIGHT} "
+                             f"with {DENSE_BULLETS} bullets")
+    parser.add_argument("--label", help="results file name, the current commit by default")
+    parser.add_argument("--compare", metavar="PATH", help="earlier results file to flag regressions against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="fractional slowdown counted as a regression")
+    args = parser.parse_args()
+
+    pygame.init()
+    revision = git_revision()
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {scenario_key(result): result for result in json.load(f)["results"]}
+
+    print(f"{'bot':>6} {'size':>10} {'obstacles':>9} {'bullets':>7} {'ticks/s':>9} {'p50 us':>8} "
+          f"{'p99 us':>8} {'move us':>8} {'bullet us':>9} {'peak KB':>8}  vs baseline")
+    results = []
+    regressions = 0
+    scenarios = list(itertools.product(args.bots, args.sizes, args.obstacles, args.bullets))
+    if args.dense:
+        scenarios += itertools.product(args.bots, [(WIDTH, HEIGHT)], DENSE_OBSTACLES, [DENSE_BULLETS])
+    for bot, size, obstacles, bullets in scenarios:
+        scenario = {"bot": bot, "size": size, "obstacles": obstacles, "bullets": bullets}
+        result = run_scenario(scenario, args.ticks, args.memory_ticks, args.seed)
+        results.append(result)
+
+        note = ""
+        before = baseline.get(scenario_key(result))
+        if before:
+            change = result["ticks_per_s"] / before["ticks_per_s"] - 1
+            note = f"{change:+.1%} ticks/s, p99 {result['p99_us'] / before['p99_us'] - 1:+.1%}"
+            if change < -args.threshold:
+                note += "  REGRESSION"
+                regressions += 1
+        print(f"{bot:>6} {'%dx%d' % size:>10} {obstacles:>9} {bullets:>7} {result['ticks_per_s']:>9.0f} "
+              f"{result['p50_us']:>8.1f} {result['p99_us']:>8.1f} {result['move_us']:>8.1f} {result['bullets_us']:>9.1f} "
+              f"{result['peak_kb']:>8.0f}  {note}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{args.label or revision}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "revision": revision,
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver,
+            "seed": args.seed,
+            "results": results,
+        }, f, indent=1)
+    print(f"saved {path}")
+    pygame.quit()
+    if regressions:
+        print(f"{regressions} scenario(s) slower than the baseline by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
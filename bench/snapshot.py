@@ -0,0 +1,132 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from Levels import *
+from World import *
+from Rewind import *
+from sim import BENCH_HEALTH, top_up_bullets
+
+def bench_world(level, players, bullets, seed):
+    # A free-for-all of players that can't die, a second into the match with
+    # `bullets` in flight
+    rng = random.Random(seed)
+    world = level_world(level, teams=make_teams(players, players))
+    for player in world.players:
+        player.health = BENCH_HEALTH
+    for _ in range(TICK_RATE):
+        top_up_bullets(world, rng, bullets)
+        world.step([rng.getrandbits(5) for _ in world.players])
+    top_up_bullets(world, rng, bullets)
+    return world, rng
+
+def save_restore(level, players, bullets, repeats, seed):
+    # Mean µs to save into a preallocated buffer, to save to new bytes, and
+    # to restore
+    world, _ = bench_world(level, players, bullets, seed)
+    buffer = bytearray(world.state_size())
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(repeats):
+        world.save_state(buffer)
+    into = clock() - start
+    start = clock()
+    for _ in range(repeats):
+        data = world.save_state()
+    fresh = clock() - start
+    checksum = world.checksum()
+    start = clock()
+    for _ in range(repeats):
+        world.load_state(buffer)
+    restore = clock() - start
+    assert bytes(buffer) == data and world.checksum() == checksum
+    return len(data), into / repeats * 1e6, fresh / repeats * 1e6, restore / repeats * 1e6
+
+def rewind_check(level, ticks, back, seed):
+    # Plays `ticks` ticks recording a Rewind, goes back `back` ticks and plays
+    # the same inputs again; the world has to end up exactly where it was.
+    # Returns whether it did and the mean µs per recorded tick
+    world, rng = bench_world(level, 2, 0, seed)
+    rewind = Rewind(world)
+    inputs = {}
+    recording = 0.0
+    for _ in range(ticks):
+        inputs[world.tick] = [rng.getrandbits(5) for _ in world.players]
+        world.step(inputs[world.tick])
+        start = time.perf_counter()
+        rewind.record(world)
+        recording += time.perf_counter() - start
+    end, expected = world.tick, world.checksum()
+    rewind.rewind(world, back)
+    while world.tick < end:
+        world.step(inputs[world.tick])
+    return world.checksum() == expected, recording / ticks * 1e6
+
+def rollouts(level, players, branches, horizon, seed):
+    # Branching from one state a second into the match: seconds for `branches`
+    # rollouts of `horizon` ticks restored from a snapshot, and the same
+    # rollouts each replayed from tick 0. Both have to agree on every branch
+    rng = random.Random(seed)
+    prefix = [[rng.getrandbits(5) for _ in range(players)] for _ in range(TICK_RATE)]
+    plans = [[[rng.getrandbits(5) for _ in range(players)] for _ in range(horizon)] for _ in range(branches)]
+
+    def fresh_world():
+        world = level_world(level, teams=make_teams(players, players))
+        for player in world.players:
+            player.health = BENCH_HEALTH
+        return world
+
+    world = fresh_world()
+    for inputs in prefix:
+        world.step(inputs)
+    root = world.save_state()
+    start = time.perf_counter()
+    restored = []
+    for plan in plans:
+        world.load_state(root)
+        for inputs in plan:
+            world.step(inputs)
+        restored.append(world.checksum())
+    branched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    replayed = []
+    for plan in plans:
+        world = fresh_world()
+        for inputs in prefix + plan:
+            world.step(inputs)
+        replayed.append(world.checksum())
+    from_zero = time.perf_counter() - start
+    return branched, from_zero, restored == replayed
+
+def main():
+    parser = argparse.ArgumentParser(description="World snapshot, restore and rewind cost")
+    parser.add_argument("--level", choices=sorted(LEVELS), default="canyon")
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    level = load_level(args.level)
+    print(f"{'players':>7} {'bullets':>7} {'bytes':>7} {'save us':>8} {'to bytes us':>11} {'restore us':>10}")
+    for players, bullets in ((2, 0), (2, 100), (16, 500), (64, 2000)):
+        size, into, fresh, restore = save_restore(level, players, bullets, args.repeats, args.seed)
+        print(f"{players:>7} {bullets:>7} {size:>7} {into:>8.1f} {fresh:>11.1f} {restore:>10.1f}")
+
+    ring = Rewind(level_world(level))
+    same, recording = rewind_check(level, 4 * REWIND_SECONDS * TICK_RATE, REWIND_SECONDS * TICK_RATE, args.seed)
+    print(f"\nrewind: {len(ring.buffers)} slots, {recording:.1f} us to record a tick; "
+          f"back {REWIND_SECONDS}s and forward again {'matches' if same else 'DIFFERS'}")
+
+    branched, from_zero, agree = rollouts(level, 8, 32, TICK_RATE, args.seed)
+    print(f"32 rollouts of {TICK_RATE} ticks from tick {TICK_RATE}: {branched * 1000:.1f} ms restored, "
+          f"{from_zero * 1000:.1f} ms replayed from tick 0, {'same' if agree else 'DIFFERENT'} results")
+    if not (same and agree):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
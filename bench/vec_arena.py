@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from Levels import *
+from World import *
+from VecArena import *
+
+def arena_state(arena, i):
+    # Everything World.checksum covers, for arena i, with the bullets sorted
+    # since the two pools keep them in different orders
+    pool = arena.bullets
+    mine = pool.arena[:pool.count] == i
+    bullets = sorted(zip(pool.x[:pool.count][mine].tolist(), pool.y[:pool.count][mine].tolist(),
+                         pool.dx[:pool.count][mine].tolist(), pool.dy[:pool.count][mine].tolist(),
+                         pool.owner[:pool.count][mine].tolist()))
+    players = [(int(arena.x[i, p]), int(arena.y[i, p]), float(arena.vertical_velocity[i, p]),
+                int(arena.health[i, p]), bool(arena.on_ground[i, p]), bool(arena.exploding[i, p]),
+                int(arena.explosion_frame[i, p])) for p in range(2)]
+    return int(arena.tick[i]), bool(arena.game_over[i]), players, bullets
+
+def world_state(world):
+    pool = world.bullets
+    n = pool.count
+    bullets = sorted(zip(pool.x[:n].tolist(), pool.y[:n].tolist(), pool.dx[:n].tolist(),
+                         pool.dy[:n].tolist(), pool.owner[:n].tolist()))
+    players = [(p.rect.x, p.rect.y, float(p.vertical_velocity), p.health, p.on_ground, p.exploding,
+                p.explosion_frame) for p in world.players]
+    return world.tick, world.game_over, players, bullets
+
+def check(level, arenas, ticks, seed):
+    # Steps a VecArena and one World per arena with the same inputs and
+    # compares every arena's full state after every tick
+    level = load_level(level)
+    arena = VecArena(arenas, level.obstacles, level.width, level.height, spawns=level.spawns, grid=level.grid)
+    worlds = [level_world(level) for _ in range(arenas)]
+    rng = np.random.default_rng(seed)
+    matches = 0
+    for tick in range(ticks):
+        inputs = rng.integers(0, 32, size=(arenas, 2))
+        finished = arena.step(inputs)
+        for i, world in enumerate(worlds):
+            world.step(inputs[i].tolist())
+            if world.game_over:
+                if finished[i] != world.winner:
+                    print(f"arena {i} tick {tick}: winner {finished[i]}, World says {world.winner}")
+                    return False
+                world.reset()
+                matches += 1
+            if arena_state(arena, i) != world_state(world):
+                print(f"arena {i} differs from World after tick {tick}")
+                print("  VecArena:", arena_state(arena, i))
+                print("  World:   ", world_state(world))
+                return False
+    print(f"ok: {arenas} arenas match World over {ticks} ticks ({matches} matches)")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="VecArena throughput, and its agreement with World")
+    parser.add_argument("--level", choices=sorted(LEVELS), default="arena")
+    parser.add_argument("--arenas", type=int, nargs="+", default=[1, 64, 1024, 8192])
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="compare against World instead of timing")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if check(args.level, min(args.arenas), args.ticks, args.seed) else 1)
+
+    level = load_level(args.level)
+    print(f"{'arenas':>7} {'steps/s':>9} {'arena-steps/s':>14} {'per minute':>11}")
+    for n in args.arenas:
+        arena = VecArena(n, level.obstacles, level.width, level.height, spawns=level.spawns, grid=level.grid)
+        rng = np.random.default_rng(args.seed)
+        inputs = rng.integers(0, 32, size=(args.ticks, n, 2))
+        start = time.perf_counter()
+        for tick in range(args.ticks):
+            arena.step(inputs[tick])
+        elapsed = time.perf_counter() - start
+        rate = n * args.ticks / elapsed
+        print(f"{n:>7} {args.ticks / elapsed:>9.0f} {rate:>14.0f} {rate * 60 / 1e6:>10.1f}M")
+
+if __name__ == "__main__":
+    main()
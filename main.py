@@ -1,116 +1,439 @@
-import pygame
+import argparse
+import asyncio
+import gc
+import os
+import random
 import sys
-import math
-from Obstacle import *
+import time
+import pygame
+from Levels import *
 from Player import *
+from World import *
+from TextCache import *
+from Assets import *
+from Renderer import *
+from Capture import *
+from Replay import *
+from Rewind import *
+from Bots import *
+from Profiler import *
+from Net import *
 
-pygame.init()
+# Longest frame the accumulator will catch up on, so a stalled window can't spiral
+MAX_FRAME_TIME = 0.25
+MAX_FPS = 120
 
-WIDTH, HEIGHT = 1000, 750
-win = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Two Player Shooter")
+HUD_FONT_SIZE = 36
+LOADING_FONT_SIZE = 36
+LOADING_BAR_SIZE = (400, 20)
+REPLAY_FONT_SIZE = 50
+PROFILE_OVERLAY_KEY = pygame.K_F3
+# Held, runs the match backwards a tick at a time, as far as the Rewind ring reaches
+REWIND_KEY = pygame.K_BACKSPACE
+# Replays store the player count in a byte
+MAX_PLAYERS = 255
 
-background_image = pygame.image.load("ground.jpg")
-background_image = pygame.transform.scale(background_image, (WIDTH, HEIGHT))
+# Movement keys for each player, in INPUT_* order
+key_bindings = [
+    ((pygame.K_w, INPUT_UP), (pygame.K_s, INPUT_DOWN), (pygame.K_a, INPUT_LEFT), (pygame.K_d, INPUT_RIGHT)),
+    ((pygame.K_UP, INPUT_UP), (pygame.K_DOWN, INPUT_DOWN), (pygame.K_LEFT, INPUT_LEFT), (pygame.K_RIGHT, INPUT_RIGHT)),
+]
+shoot_keys = [pygame.K_SPACE, pygame.K_RETURN]
 
-obstacles = [
-    Obstacle(100, 300, 200, 10),
-    Obstacle(600, 400, 200, 10),
-    Obstacle(300, 500, 200, 10),
-    Obstacle(50, 550, 200, 10),
-    Obstacle(900, 450,200,10),
-    Obstacle(500, 700, 200, 10),
-    Obstacle(800, 600, 200, 10),
-    Obstacle(500, 250, 200, 10),
-    Obstacle(800,150,200,10),
-    Obstacle(200,100,200,10)
+def read_inputs(keys, bindings):
+    inputs = 0
+    for key, bit in bindings:
+        if keys[key]:
+            inputs |= bit
+    return inputs
 
-]
+def make_replay_button(size, text_cache):
+    # The button is composed once and then blitted like any other overlay
+    text = text_cache.render("Replay", REPLAY_FONT_SIZE, BLACK)
+    rect = text.get_rect(center=(size[0] // 2, size[1] // 2)).inflate(20, 20)
+    button = pygame.Surface(rect.size)
+    button.fill(GRAY)
+    button.blit(text, (10, 10))
+    return button, rect
+
+def hud_overlays(world, text_cache, width):
+    # width is the window's, which on a big level is less than the world's
+    # Display health; the text is only rasterized again when the health changes
+    # Health is shown for the two keyboard players, and in bigger matches
+    # how many are still in it
+    player1, player2 = world.players[:2]
+    health_text1 = text_cache.render(f'Health: {player1.health}', HUD_FONT_SIZE, BLACK)
+    health_text2 = text_cache.render(f'Health: {player2.health}', HUD_FONT_SIZE, BLACK)
+    overlays = [(health_text1, (10, 10)), (health_text2, (width - 150, 10))]
+    if len(world.players) > 2:
+        left = len(world.players) - int(world.combat.out(world.players).sum())
+        text = text_cache.render(f'Players left: {left}', HUD_FONT_SIZE, BLACK)
+        overlays.append((text, (width // 2 - text.get_width() // 2, 10)))
+    return overlays
+
+def winner_text(world):
+    # In a free-for-all every player is their own team
+    if len(set(world.teams)) == len(world.teams):
+        return f"Player {world.winner + 1} Wins!"
+    return f"Team {world.winner + 1} Wins!"
+
+def init_window():
+    # Only what a window needs: video and fonts. Headless runs and the server
+    # never call this, and nothing here plays sound, so audio stays off
+    pygame.display.init()
+    pygame.font.init()
+
+def show_loading(loader, width, height):
+    # Keeps a window painted and responsive until every queued asset is
+    # decoded. Returns False if the window was closed meanwhile
+    win = pygame.display.set_mode((width, height))
+    text = pygame.font.Font(None, LOADING_FONT_SIZE).render("Loading...", True, WHITE)
+    bar = pygame.Rect((0, 0), LOADING_BAR_SIZE)
+    bar.center = (width // 2, height // 2 + text.get_height())
+    clock = pygame.time.Clock()
+    while not loader.done():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                loader.close()
+                return False
+        win.fill(BLACK)
+        win.blit(text, text.get_rect(center=(width // 2, height // 2 - text.get_height())))
+        pygame.draw.rect(win, GRAY, bar, 1)
+        pygame.draw.rect(win, GRAY, (bar.x, bar.y, int(bar.width * loader.progress()), bar.height))
+        pygame.display.flip()
+        clock.tick(MAX_FPS)
+    return True
+
+def open_renderer(name, level):
+    # The background decodes on a worker thread behind a loading screen, then
+    # the renderer is created from it. None if the window was closed first
+    if name == "null":
+        return create_renderer(name, *level.view, None, level.obstacles, level.size)
+    loader = AssetLoader()
+    background = loader.load(level.background_path, level.view)
+    if not show_loading(loader, *level.view):
+        return None
+    loader.close()
+    return create_renderer(name, *level.view, background.result(), level.obstacles, level.size)
+
+def pause_gc():
+    # Everything loaded so far lives for the whole run, so it is moved out of
+    # the collector's generations and automatic collections stop; the cyclic
+    # garbage a match leaves behind is collected between rounds instead
+    gc.collect()
+    gc.freeze()
+    gc.disable()
+
+def collect_between_rounds():
+    # Only needed while pause_gc() has automatic collection off
+    if not gc.isenabled():
+        gc.collect()
+
+def run_window(world, renderer, recorder=None, bots=()):
+    # The keyboard plays the first two players and bots, if any, the rest
+    # Load the fonts up front so the first frames don't stall on SysFont
+    text_cache = TextCache()
+    text_cache.font(None, HUD_FONT_SIZE)
+    text_cache.font(None, REPLAY_FONT_SIZE)
+    width, height = renderer.camera.size
+    replay_button, replay_button_rect = make_replay_button((width, height), text_cache)
+
+    profiler = world.profiler
+    profile_overlay = ProfileOverlay(profiler, text_cache)
+
+    # Shots fire on KEYDOWN, so they are latched until the next tick consumes them
+    pending_shots = [0, 0]
+    # A recording can't rewind, so there is nothing to rewind into while recording
+    rewind = None if recorder else Rewind(world)
+    if rewind is not None:
+        rewind.record(world)
+
+    # Main game loop
+    running = True
+    clock = pygame.time.Clock()
+    accumulator = 0.0
+    previous = time.perf_counter()
+
+    while running:
+        clock.tick(MAX_FPS)
+        profiler.begin_frame()
+        now = time.perf_counter()
+        accumulator += min(now - previous, MAX_FRAME_TIME)
+        previous = now
+
+        with profiler.scope("events"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                if event.type == pygame.KEYDOWN and event.key == PROFILE_OVERLAY_KEY:
+                    profile_overlay.toggle()
+                    renderer.invalidate()
+                if event.type == pygame.KEYDOWN and not world.game_over:
+                    for i, key in enumerate(shoot_keys):
+                        if event.key == key:
+                            pending_shots[i] = INPUT_SHOOT
+                if event.type == pygame.MOUSEBUTTONDOWN and world.game_over:
+                    if replay_button_rect.collidepoint(event.pos):
+                        world.reset()
+                        collect_between_rounds()
+                        if recorder:
+                            recorder.mark_reset()
+                        if rewind is not None:
+                            rewind.clear()
+                            rewind.record(world)
+
+            # Get key presses
+            keys = pygame.key.get_pressed()
+
+        with profiler.scope("simulate"):
+            while accumulator >= TICK_DT:
+                if rewind is not None and keys[REWIND_KEY]:
+                    rewind.rewind(world, 1)
+                    pending_shots = [0, 0]
+                    accumulator -= TICK_DT
+                    continue
+                inputs = [read_inputs(keys, bindings) | shot for bindings, shot in zip(key_bindings, pending_shots)]
+                inputs += [bot(world, i) for i, bot in enumerate(bots, len(inputs))]
+                pending_shots = [0, 0]
+                if recorder:
+                    recorder.record(inputs)
+                was_over = world.game_over
+                world.step(inputs)
+                if rewind is not None:
+                    rewind.record(world)
+                if world.game_over and not was_over:
+                    print(winner_text(world))
+                accumulator -= TICK_DT
+
+        with profiler.scope("hud"):
+            overlays = hud_overlays(world, text_cache, width)
+            if world.game_over:
+                overlays.append((replay_button, replay_button_rect))
+            stats = profile_overlay.overlay()
+            if stats:
+                overlays.append(stats)
+
+        # draw includes present, which is also timed on its own
+        with profiler.scope("draw"):
+            renderer.draw(world, overlays)
+        profiler.end_frame()
+
+async def run_client_window(client, renderer):
+    # One networked player on this machine; either set of movement keys and
+    # either shoot key controls it. The window loop yields to asyncio every
+    # frame so snapshots are received in between
+    world = client.world
+    width = renderer.camera.size[0]
+    # On a level bigger than the window, the camera stays on this player
+    renderer.camera.focus = [client.slot]
+    text_cache = TextCache()
+    text_cache.font(None, HUD_FONT_SIZE)
+    you = text_cache.render(f"You are player {client.slot + 1}", HUD_FONT_SIZE, BLACK)
+    pending_shot = 0
+    running = True
+    accumulator = 0.0
+    previous = time.perf_counter()
+    while running:
+        now = time.perf_counter()
+        accumulator += min(now - previous, MAX_FRAME_TIME)
+        previous = now
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN and event.key in shoot_keys:
+                pending_shot = INPUT_SHOOT
+        keys = pygame.key.get_pressed()
+        while accumulator >= TICK_DT:
+            client.tick(read_inputs(keys, key_bindings[0] + key_bindings[1]) | pending_shot)
+            pending_shot = 0
+            accumulator -= TICK_DT
+        overlays = hud_overlays(world, text_cache, width)
+        overlays.append((you, (width // 2 - you.get_width() // 2, 10)))
+        renderer.draw(world, overlays)
+        await asyncio.sleep(max(0.0, 1 / MAX_FPS - (time.perf_counter() - now)))
+
+async def run_client(args):
+    host, _, port = args.connect.rpartition(":")
+    client = await connect(host or "127.0.0.1", int(port))
+    pygame.display.set_caption(f"Two Player Shooter - {args.connect}")
+    renderer = open_renderer(args.renderer, load_level(client.level))
+    if renderer:
+        if args.particles:
+            client.world.particles = ParticleSystem(args.particles)
+        await run_client_window(client, renderer)
+    client.close()
+
+async def run_server(args):
+    server, port = await start_server(args.level, "0.0.0.0", args.serve)
+    print(f"serving {args.level} on UDP port {port}")
+    await server.run()
+
+def open_capture(args, level):
+    # The offscreen renderer for --capture, writing every frame it draws.
+    # Sprites convert() to the display's format, so a mode has to be set,
+    # though with the dummy video driver it opens no window
+    pygame.display.set_mode((1, 1))
+    writer = FrameWriter(args.capture, level.view, args.capture_format, args.capture_policy)
+    background = decode_image(level.background_path, level.view)
+    return CaptureRenderer(writer, background, level.obstacles, Camera(*level.view, *level.size))
+
+def capture_frames(renderer):
+    # A function that draws and captures one frame of a world, HUD and all
+    text_cache = TextCache()
+    width = renderer.camera.size[0]
+    return lambda world: renderer.draw(world, hud_overlays(world, text_cache, width))
+
+def run_headless(world, ticks, seed, recorder=None, frame=None):
+    # No window and no display.update, so ticks are bounded only by the
+    # simulation, and with frame, by capturing one frame per tick
+    rng = random.Random(seed)
+    matches = 0
+    start = time.perf_counter()
+    profiler = world.profiler
+    for _ in range(ticks):
+        profiler.begin_frame()
+        inputs = [rng.getrandbits(5) for _ in world.players]
+        if recorder:
+            recorder.record(inputs)
+        world.step(inputs)
+        if frame:
+            frame(world)
+        profiler.end_frame()
+        if world.game_over:
+            matches += 1
+            world.reset()
+            collect_between_rounds()
+            if recorder:
+                recorder.mark_reset()
+    elapsed = time.perf_counter() - start
+    print(f"{ticks} ticks, {matches} matches in {elapsed:.2f}s ({ticks / elapsed:.0f} ticks/s)")
+
+def run_replay(world, replay, frame=None):
+    # Plays a recorded match back headlessly, as fast as the simulation
+    # allows, and with frame, captures it one frame per tick
+    start = time.perf_counter()
+    for reset, inputs in replay:
+        if reset:
+            world.reset()
+        world.step(inputs)
+        if frame:
+            frame(world)
+    elapsed = time.perf_counter() - start
+    print(f"{replay.ticks} ticks in {elapsed:.2f}s ({replay.ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+    checksum = world.checksum()
+    if checksum == replay.checksum:
+        print(f"final state matches the recording ({checksum:08x})")
+    else:
+        print(f"DESYNC: final state {checksum:08x}, recorded {replay.checksum:08x}")
+    return checksum == replay.checksum
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Two Player Shooter")
+    parser.add_argument("--renderer", choices=RENDERERS, default="software", help="drawing backend")
+    parser.add_argument("--level", choices=sorted(LEVELS), default="arena", help="platform layout")
+    parser.add_argument("--headless", action="store_true",
+                        help="run the simulation with random inputs and no window, as fast as possible")
+    parser.add_argument("--ticks", type=int, default=100000, help="ticks to simulate in headless mode")
+    parser.add_argument("--seed", type=int, default=0, help="random input seed for headless mode")
+    parser.add_argument("--record", metavar="PATH", help="save every tick's inputs to a replay file")
+    parser.add_argument("--replay", metavar="PATH", help="play a replay file back headlessly and check it for desyncs")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="run a headless server for two networked players (0 picks a free port)")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="join a server as one networked player")
+    parser.add_argument("--profile-out", metavar="PATH",
+                        help="write per-frame timings and counters to a .csv or .json file on exit")
+    parser.add_argument("--gc-freeze", action="store_true",
+                        help="no garbage collection during rounds, only in between them")
+    parser.add_argument("--particles", type=int, default=PARTICLE_BUDGET, metavar="N",
+                        help="most effect particles alive at once (0 turns effects off)")
+    parser.add_argument("--players", type=int, default=2, metavar="N",
+                        help="players in the match; past the two on the keyboard they are bots")
+    parser.add_argument("--teams", type=int, metavar="K",
+                        help="teams the players are dealt into in turn (default: every player for themselves)")
+    parser.add_argument("--capture", metavar="PATH",
+                        help="render the headless run or replay offscreen and save every tick's frame: "
+                             "PNGs into a directory, or raw rgb24 video to a file")
+    parser.add_argument("--capture-format", choices=CAPTURE_FORMATS, default="png")
+    parser.add_argument("--capture-policy", choices=CAPTURE_POLICIES, default="block",
+                        help="when the writer falls behind, drop frames or hold the game back")
+    args = parser.parse_args(argv)
+
+    replay = Replay(args.replay) if args.replay else None
+    if replay:
+        args.level, args.players, args.teams = replay.level, replay.players, replay.teams
+    teams = args.teams or args.players
+    if not 2 <= args.players <= MAX_PLAYERS:
+        parser.error(f"--players must be between 2 and {MAX_PLAYERS}")
+    if not 2 <= teams <= args.players:
+        parser.error("--teams must be between 2 and the number of players")
+    if (args.serve is not None or args.connect) and args.players != NET_PLAYERS:
+        parser.error(f"networked matches are {NET_PLAYERS} players")
+    recorder = ReplayRecorder(args.level, args.players, teams) if args.record else None
+
+    if args.serve is not None:
+        asyncio.run(run_server(args))
+        return
+    if args.connect:
+        init_window()
+        asyncio.run(run_client(args))
+        pygame.quit()
+        return
+
+    windowed = not (args.headless or replay or args.capture)
+    if windowed or args.capture:
+        if args.renderer == "null" or args.capture:
+            # Has to be set before the display is initialized
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+        init_window()
+    level = load_level(args.level)
+    # Headless runs only pay for profiling when its output was asked for
+    if args.profile_out or windowed:
+        profiler = Profiler(record=bool(args.profile_out))
+    else:
+        profiler = NULL_PROFILER
+    world = level_world(level, profiler, make_teams(args.players, teams))
+    frame = None
+    if args.capture:
+        renderer = open_capture(args, level)
+        renderer.profiler = profiler
+        if args.particles:
+            world.particles = ParticleSystem(args.particles)
+        frame = capture_frames(renderer)
+    in_sync = True
+    if replay:
+        in_sync = run_replay(world, replay, frame)
+    elif not windowed:
+        if args.gc_freeze:
+            pause_gc()
+        run_headless(world, args.ticks, args.seed, recorder, frame)
+    else:
+        pygame.display.set_caption("Two Player Shooter")
+        renderer = open_renderer(args.renderer, level)
+        if renderer:
+            renderer.profiler = profiler
+            if args.particles:
+                world.particles = ParticleSystem(args.particles)
+            if args.gc_freeze:
+                pause_gc()
+            bots = [NavBot(random.Random(args.seed + i)) for i in range(2, args.players)]
+            if bots:
+                # Compiled now rather than on the bots' first tick, mid-match
+                nav_graph(world)
+                # On a level bigger than the window, the camera stays on the keyboard players
+                renderer.camera.focus = [0, 1]
+            run_window(world, renderer, recorder, bots)
+    if args.capture:
+        writer = renderer.writer
+        writer.close()
+        print(f"captured {writer.written} frames to {args.capture}, dropped {writer.dropped}, "
+              f"waited {writer.waited:.2f}s on the writer")
+    if recorder:
+        recorder.save(args.record, world.checksum())
+    if args.profile_out:
+        profiler.export(args.profile_out)
 
-def reset_game():
-    global player1, player2, game_over, replay_button_rect
-    player1 = Player(100, HEIGHT // 2 - player_size // 2, RED)
-    player2 = Player(WIDTH - 100 - player_size, HEIGHT // 2 - player_size // 2, BLUE)
-    game_over = False
-    replay_button_rect = None
-
-def draw_replay_button(win):
-    font = pygame.font.SysFont(None, 50)
-    text = font.render("Replay", True, BLACK)
-    rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-    pygame.draw.rect(win, GRAY, rect.inflate(20, 20))
-    win.blit(text, rect)
-    return rect
-
-# Initialize game state
-reset_game()
-
-# Main game loop
-running = True
-clock = pygame.time.Clock()
-
-while running:
-    clock.tick(60)  
-    
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-            pygame.quit()
-            sys.exit()
-        if event.type == pygame.KEYDOWN and not game_over:
-            if event.key == pygame.K_SPACE:
-                player1.shoot((player2.rect.centerx, player2.rect.centery))
-            if event.key == pygame.K_RETURN:
-                player2.shoot((player1.rect.centerx, player1.rect.centery))
-        if event.type == pygame.MOUSEBUTTONDOWN and game_over:
-            if replay_button_rect and replay_button_rect.collidepoint(event.pos):
-                reset_game()
-
-    # Get key presses
-    keys = pygame.key.get_pressed()
-    if not game_over:
-        player1.move(keys, pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d, [obs.rect for obs in obstacles])
-        player2.move(keys, pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT, [obs.rect for obs in obstacles])
-
-        # Handle bullets and check for collisions
-        player1.handle_bullets(player2, [obs.rect for obs in obstacles])
-        player2.handle_bullets(player1, [obs.rect for obs in obstacles])
-
-    win.blit(background_image, (0, 0))
-
-    # Draw everything
-    player1.draw(win)
-    player2.draw(win)
-    for obstacle in obstacles:
-        obstacle.draw(win)
-
-    # Display health
-    font = pygame.font.SysFont(None, 36)
-    health_text1 = font.render(f'Health: {player1.health}', True, BLACK)
-    health_text2 = font.render(f'Health: {player2.health}', True, BLACK)
-    win.blit(health_text1, (10, 10))
-    win.blit(health_text2, (WIDTH - 150, 10))
-
-    if game_over:
-        replay_button_rect = draw_replay_button(win)
-
-    pygame.display.update()
-
-    # Check for game over and trigger explosion
-    if player1.health <= 0 and not player1.exploding:
-        player1.exploding = True
-        player1.explosion_frame = 0
-    if player2.health <= 0 and not player2.exploding:
-        player2.exploding = True
-        player2.explosion_frame = 0
-
-    if player1.health <= 0 and player1.explosion_frame >= explosion_duration:
-        print("Player 2 Wins!")
-        game_over = True
-    if player2.health <= 0 and player2.explosion_frame >= explosion_duration:
-        print("Player 1 Wins!")
-        game_over = True
-
-pygame.quit()
-sys.exit()
+    pygame.quit()
+    sys.exit(0 if in_sync else 1)
 
+if __name__ == "__main__":
+    main()